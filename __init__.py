@@ -1,3 +1,3 @@
-from config import Settings
+from config import get_settings
 
-settings = Settings()
+settings = get_settings()
@@ -0,0 +1,47 @@
+from typing import TYPE_CHECKING, Optional
+
+from config import get_settings
+from http_client import http2_enabled
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+settings = get_settings()
+
+_client: Optional["AsyncAnthropic"] = None
+
+
+def get_anthropic_client() -> "AsyncAnthropic":
+    """One connection-pooled Claude client shared by every call in the process.
+
+    The SDK's own retries are off: `rate_limiter.create_message` retries 429s
+    (pausing every caller) as well as connection errors, timeouts and 5xx,
+    while keeping every call within the shared quota.
+    """
+    global _client
+    if _client is None:
+        import httpx
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        _client = AsyncAnthropic(
+            api_key=str(settings.ANTHROPIC),
+            max_retries=0,
+            timeout=settings.ANTHROPIC_TIMEOUT,
+            http_client=DefaultAsyncHttpxClient(
+                http2=http2_enabled(),
+                timeout=settings.ANTHROPIC_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+                ),
+            ),
+        )
+    return _client
+
+
+async def close_anthropic_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,198 @@
+"""Local stand-ins for Tavily, the Anthropic messages API and business websites.
+
+Run by `benchmarks.run` in its own process so the fakes do not compete with
+the pipeline for the event loop:
+
+    python -m benchmarks.fake_services --port 8765 --locations 4
+"""
+
+import re
+import json
+import asyncio
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+
+from benchmarks.world import World, build_world
+
+BUSINESS_RE = re.compile(
+    r"Business: (?P<name>[^;\n]+); Address: (?P<address>[^;\n]+); "
+    r"Phone: (?P<phone>[^;\n]+); Website: (?P<website>\S+)"
+)
+PAGE_RE = re.compile(r'<page id="(\d+)">(.*?)</page>', re.DOTALL)
+LOCATION_RE = re.compile(r"kids activities in (.+?) \(postcode: (\d{4})\)")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def businesses_in(text: str) -> list:
+    records = []
+    for match in BUSINESS_RE.finditer(text):
+        address = match["address"].strip()
+        records.append(
+            {
+                "business_name": match["name"].strip(),
+                "address": address,
+                "phone_number": match["phone"].strip(),
+                "email": "",
+                "website_link": match["website"].strip().rstrip(")"),
+                "postcode": address[-4:],
+                "internal_navigation_link": "",
+            }
+        )
+    return records
+
+
+def answer(prompt: str, queries_per_location: int) -> str:
+    """What Claude would reply to each of the pipeline's prompts"""
+    if "different search queries" in prompt:
+        match = LOCATION_RE.search(prompt)
+        location, postcode = match.groups() if match else ("Sydney", "2000")
+        return json.dumps(
+            [
+                f"kids activity {n} {location} NSW {postcode}"
+                for n in range(queries_per_location)
+            ]
+        )
+    if '<page id="' in prompt:
+        return json.dumps(
+            {page_id: businesses_in(body) for page_id, body in PAGE_RE.findall(prompt)}
+        )
+    if "extract only missing information" in prompt:
+        return "{}"
+    return json.dumps(businesses_in(prompt))
+
+
+def home_page(site) -> str:
+    details = (
+        f"Business: {site.name}; Address: {site.address}; "
+        f"Phone: {site.phone}; Website: {site.url}"
+    )
+    body = f"""
+        <header><nav><a href="/site/{site.id}/">Home</a>
+        <a href="/site/{site.id}/contact">Contact us</a></nav></header>
+        <main>
+          <h1>{site.name}</h1>
+          <p>{details}</p>
+          <p>Weekly classes for kids aged 1-8 in {site.location} NSW {site.postcode}.
+          Term bookings are open now; enrol online or call us to book a trial.</p>
+          <p>Find us at {site.address}, close to public transport and parking.</p>
+        </main>
+        <footer>&copy; {site.name}</footer>
+    """
+    if not site.js_rendered:
+        return f"<html><head><title>{site.name}</title></head><body>{body}</body></html>"
+    # Client-side rendered: the content only appears once the script runs
+    return (
+        f"<html><head><title>{site.name}</title></head><body>"
+        f'<div id="root"></div><script>document.getElementById("root").innerHTML = '
+        f"{json.dumps(body)};</script></body></html>"
+    )
+
+
+def contact_page(site) -> str:
+    return f"""<html><body><main>
+        <h1>Contact {site.name}</h1>
+        <p>Phone: <a href="tel:{site.phone}">{site.phone}</a></p>
+        <p>Email: <a href="mailto:{site.email}">{site.email}</a></p>
+        <p>Visit us at {site.address}. Our front desk is open Monday to Friday
+        9am-5pm and Saturday 8am-12pm. For class bookings, trial lessons and
+        term enrolments in {site.location} NSW {site.postcode}, call or email
+        and we will get back to you within one business day.</p>
+    </main></body></html>"""
+
+
+def create_app(world: World, args) -> FastAPI:
+    app = FastAPI()
+    sites = {site.id: site for site in world.sites}
+
+    @app.get("/ready")
+    async def ready():
+        return {"sites": len(world.sites)}
+
+    @app.post("/search")
+    async def search(request: Request):
+        payload = await request.json()
+        await asyncio.sleep(args.search_latency)
+        found = world.sites_for_query(payload["query"], payload.get("max_results", 5))
+        return {
+            "query": payload["query"],
+            "results": [{"url": site.url, "title": site.name} for site in found],
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        payload = await request.json()
+        prompt = str(payload.get("system", "")) + "".join(
+            str(message.get("content", "")) for message in payload.get("messages", [])
+        )
+        text = answer(prompt, args.queries)
+        output_tokens = estimate_tokens(text)
+        await asyncio.sleep(args.llm_latency + output_tokens / args.llm_tokens_per_second)
+        return JSONResponse(
+            {
+                "id": "msg_fake",
+                "type": "message",
+                "role": "assistant",
+                "model": payload.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {
+                    "input_tokens": estimate_tokens(prompt),
+                    "output_tokens": output_tokens,
+                },
+            }
+        )
+
+    @app.get("/robots.txt")
+    async def robots():
+        return PlainTextResponse("User-agent: *\nAllow: /\n")
+
+    @app.get("/site/{site_id}/")
+    async def home(site_id: int):
+        await asyncio.sleep(args.site_latency)
+        if site_id not in sites:
+            return HTMLResponse("Not found", status_code=404)
+        return HTMLResponse(home_page(sites[site_id]))
+
+    @app.get("/site/{site_id}/{page}")
+    async def page(site_id: int, page: str):
+        await asyncio.sleep(args.site_latency)
+        if site_id not in sites or page not in ("contact", "contact-us"):
+            return HTMLResponse("Not found", status_code=404)
+        return HTMLResponse(contact_page(sites[site_id]))
+
+    return app
+
+
+def add_world_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--locations", type=int, default=4)
+    parser.add_argument("--sites-per-location", type=int, default=12)
+    parser.add_argument("--js-ratio", type=float, default=0.2)
+    parser.add_argument("--queries", type=int, default=6, help="queries per location")
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--site-latency", type=float, default=0.15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, required=True)
+    add_world_arguments(parser)
+    args = parser.parse_args()
+    world = build_world(
+        args.locations, args.sites_per_location, args.js_ratio, args.port
+    )
+    uvicorn.run(
+        create_app(world, args), host="0.0.0.0", port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
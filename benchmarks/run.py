@@ -0,0 +1,297 @@
+"""Offline end-to-end benchmark of the location scan pipeline.
+
+Runs the real `run_pipeline` against local fakes: a Tavily search server, an
+Anthropic messages endpoint with configurable latency and token accounting,
+and fixture business websites (some client-side rendered, which need the
+Playwright browser). Prospects go to the Firestore emulator when
+FIRESTORE_EMULATOR_HOST is set, otherwise to an in-memory stand-in.
+
+    python -m benchmarks.run --locations 4 --scans 4 --concurrency 2
+    python -m benchmarks.run --json results.json  # also write the report
+
+Reports scan throughput, p50/p95 latency per stage and peak RSS of this
+process plus its browsers. Caches live in a fresh temporary directory unless
+--cache-dir is given, so runs are cold by default.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+
+import httpx
+import psutil
+
+from benchmarks.fake_services import add_world_arguments
+from benchmarks.world import build_world
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class MemoryFirestore:
+    """In-process stand-in for `firebase.db` with a fixed commit latency"""
+
+    documents: Dict[str, dict] = {}
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+
+    async def get_many(self, collection_name: str, doc_ids: List[str]) -> Dict[str, dict]:
+        await asyncio.sleep(self.latency)
+        return {i: dict(self.documents[i]) for i in doc_ids if i in self.documents}
+
+    async def upsert_many(self, collection_name: str, items: Dict[str, dict]) -> List[dict]:
+        from metrics import FIRESTORE_WRITE_LATENCY
+
+        with FIRESTORE_WRITE_LATENCY.time():
+            await asyncio.sleep(self.latency)
+        for doc_id, fields in items.items():
+            self.documents.setdefault(doc_id, {}).update(fields)
+        return [{"id": i, "success": True, "error": None} for i in items]
+
+
+class PeakRSS:
+    """Samples the RSS of this process and its children (browsers)"""
+
+    def __init__(self, exclude_pid: int, interval: float = 0.2):
+        self.exclude_pid = exclude_pid
+        self.interval = interval
+        self.peak = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                if child.pid == self.exclude_pid or self.exclude_pid in (
+                    p.pid for p in child.parents()
+                ):
+                    continue
+                total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        self.peak = max(self.peak, total)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.sample()
+
+
+def configure_environment(args, port: int, cache_dir: str):
+    """Point every client at the fakes before the app modules read Settings"""
+    base = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        {
+            "ANTHROPIC": "benchmark",
+            "TAVILY": "benchmark",
+            "ANTHROPIC_BASE_URL": base,
+            "TAVILY_BASE_URL": base,
+            "CACHE_DIR": cache_dir,
+            "JOB_STORE_PATH": os.path.join(cache_dir, "jobs.sqlite"),
+            "BATCH_BACKEND": "local",
+        }
+    )
+    overrides = {
+        "HOST_MIN_INTERVAL": args.host_interval,
+        "ANTHROPIC_RPM": args.anthropic_rpm,
+        "ANTHROPIC_INPUT_TPM": args.anthropic_input_tpm,
+        "ANTHROPIC_OUTPUT_TPM": args.anthropic_output_tpm,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[name] = str(value)
+
+
+async def run_scans(args, locations: List[tuple], fake_pid: int) -> dict:
+    import metrics
+    import pipeline
+    from http_client import close_http_client
+    from anthropic_client import close_anthropic_client
+    from crawler.tavily import close_tavily_http_client
+    from scrapper.browser_pool import close_browser_pool
+
+    metrics.retain_observations()
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        pipeline.get_db = MemoryFirestore
+
+    scans = [locations[i % len(locations)] for i in range(args.scans)]
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    results = []
+
+    async def scan(location: str, postcode: str):
+        async with semaphore:
+            start = time.perf_counter()
+            first_prospect = None
+            summary = {"location": location, "postcode": postcode, "prospects": 0}
+            async for event in pipeline.run_pipeline(location, postcode):
+                if event["event"] == "prospect":
+                    summary["prospects"] += 1
+                    if first_prospect is None:
+                        first_prospect = time.perf_counter() - start
+                elif event["event"] in ("crawl", "saved", "done"):
+                    summary[event["event"]] = {
+                        k: v for k, v in event.items() if k not in ("event", "urls")
+                    }
+            summary["seconds"] = time.perf_counter() - start
+            summary["first_prospect_seconds"] = first_prospect
+            results.append(summary)
+
+    rss = PeakRSS(exclude_pid=fake_pid)
+    rss.start()
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(scan(location, postcode) for location, postcode in scans))
+    finally:
+        elapsed = time.perf_counter() - start
+        await rss.stop()
+        await close_browser_pool()
+        await close_tavily_http_client()
+        await close_anthropic_client()
+        await close_http_client()
+
+    stages = {}
+    for histogram in metrics.histograms():
+        for key, values in histogram.observations().items():
+            label = histogram.name.replace("prospects_", "")
+            if key:
+                label += "{" + ",".join(key) + "}"
+            stages[label] = {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "max": max(values),
+            }
+
+    pages = sum(r.get("crawl", {}).get("count", 0) for r in results)
+    prospects = sum(r["prospects"] for r in results)
+    return {
+        "scans": len(results),
+        "elapsed_seconds": elapsed,
+        "scans_per_minute": len(results) / elapsed * 60,
+        "pages_per_second": pages / elapsed,
+        "prospects_per_second": prospects / elapsed,
+        "peak_rss_mb": rss.peak / (1024 * 1024),
+        "stages": stages,
+        "scan_results": results,
+        "failures": {",".join(k): v for k, v in metrics.FAILURES.values().items()},
+    }
+
+
+def print_report(report: dict):
+    print()
+    print(
+        f"{report['scans']} scans in {report['elapsed_seconds']:.2f}s  "
+        f"({report['scans_per_minute']:.1f} scans/min, "
+        f"{report['pages_per_second']:.2f} pages/s, "
+        f"{report['prospects_per_second']:.2f} prospects/s)"
+    )
+    print(f"peak RSS {report['peak_rss_mb']:.0f} MB")
+    print()
+    print(f"{'stage':<44} {'count':>6} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for name, stats in sorted(report["stages"].items()):
+        print(
+            f"{name:<44} {stats['count']:>6} {stats['p50']:>8.3f} "
+            f"{stats['p95']:>8.3f} {stats['max']:>8.3f}"
+        )
+    if report["failures"]:
+        print()
+        print("failures:")
+        for name, count in sorted(report["failures"].items()):
+            print(f"  {name:<42} {count:>6.0f}")
+
+
+def wait_until_ready(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Fake services exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("Fake services did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    add_world_arguments(parser)
+    parser.add_argument("--scans", type=int, default=4, help="location scans to run")
+    parser.add_argument("--concurrency", type=int, default=2, help="scans at once")
+    parser.add_argument("--cache-dir", help="reuse caches from this directory")
+    parser.add_argument(
+        "--host-interval", type=float, help="override HOST_MIN_INTERVAL (seconds)"
+    )
+    # Defaults come from Settings, i.e. the production quota
+    parser.add_argument("--anthropic-rpm", type=int)
+    parser.add_argument("--anthropic-input-tpm", type=int)
+    parser.add_argument("--anthropic-output-tpm", type=int)
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    port = free_port()
+    world = build_world(args.locations, args.sites_per_location, args.js_ratio, port)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_services", "--port", str(port)]
+        + [
+            arg
+            for name in (
+                "locations",
+                "sites_per_location",
+                "js_ratio",
+                "queries",
+                "search_latency",
+                "llm_latency",
+                "llm_tokens_per_second",
+                "site_latency",
+            )
+            for arg in (f"--{name.replace('_', '-')}", str(getattr(args, name)))
+        ]
+    )
+    try:
+        wait_until_ready(port, process)
+        with tempfile.TemporaryDirectory() as tmp:
+            configure_environment(args, port, args.cache_dir or tmp)
+            report = asyncio.run(run_scans(args, world.locations, process.pid))
+    finally:
+        process.terminate()
+        process.wait()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
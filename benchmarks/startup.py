@@ -0,0 +1,99 @@
+"""Cold start timings of the API process.
+
+Measures, over several fresh processes:
+
+- import: seconds to `import main` (reported by the app itself)
+- ready: seconds from spawning `python main.py` until the first 200 from /health
+- prewarm: seconds until the pipeline and browser pool are loaded in the
+  background (only with STARTUP_PREWARM, and when a browser can start)
+
+    python -m benchmarks.startup --runs 5
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+import httpx
+
+from benchmarks.run import free_port
+
+STARTUP_METRIC = "prospects_startup_seconds"
+
+
+def startup_phases(metrics_text: str) -> dict:
+    phases = {}
+    for line in metrics_text.splitlines():
+        if line.startswith(STARTUP_METRIC + "{"):
+            labels, value = line.rsplit(" ", 1)
+            phases[labels.split('phase="')[1].split('"')[0]] = float(value)
+    return phases
+
+
+def measure(port: int, env: dict, prewarm_wait: float, timeout: float = 30.0) -> dict:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        env=dict(env, PORT=str(port)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("The app exited during startup")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError("The app did not become ready")
+            try:
+                if httpx.get(f"{base}/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        ready = time.perf_counter() - started
+
+        deadline = time.perf_counter() + prewarm_wait
+        phases = startup_phases(httpx.get(f"{base}/metrics").text)
+        while "prewarm" not in phases and time.perf_counter() < deadline:
+            time.sleep(0.2)
+            phases = startup_phases(httpx.get(f"{base}/metrics").text)
+        return {"ready": ready, **{k: v for k, v in phases.items() if k != "ready"}}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--prewarm-wait",
+        type=float,
+        default=0.0,
+        help="seconds to wait for the background prewarm to report",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault("ANTHROPIC", "startup-benchmark")
+        env.setdefault("TAVILY", "startup-benchmark")
+        env.setdefault("JOB_STORE_PATH", os.path.join(tmp, "jobs.sqlite"))
+        env.setdefault("CACHE_DIR", tmp)
+        runs = [measure(free_port(), env, args.prewarm_wait) for _ in range(args.runs)]
+
+    print(f"{'phase':<10} {'median s':>9} {'max s':>9}")
+    for phase in ("import", "ready", "prewarm"):
+        values = [run[phase] for run in runs if phase in run]
+        if values:
+            print(f"{phase:<10} {median(values):>9.3f} {max(values):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
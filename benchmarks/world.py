@@ -0,0 +1,111 @@
+"""Deterministic fixture world shared by the fake services and the runner.
+
+Both processes build the same `World` from the same arguments, so the fake
+search engine can point at sites the fake web server actually serves.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+SUBURBS = (
+    "Darlinghurst",
+    "Surry Hills",
+    "Paddington",
+    "Redfern",
+    "Newtown",
+    "Glebe",
+    "Bondi",
+    "Randwick",
+    "Marrickville",
+    "Balmain",
+)
+ACTIVITIES = (
+    "Swim School",
+    "Dance Studio",
+    "Music Classes",
+    "Playgroup",
+    "Art Club",
+    "Gymnastics",
+    "Language School",
+    "Sensory Play",
+)
+STREETS = ("Oxford Street", "Crown Street", "King Street", "Glebe Point Road")
+
+
+def stable_hash(*parts) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+@dataclass
+class Site:
+    id: int
+    location: str
+    postcode: str
+    name: str
+    address: str
+    phone: str
+    email: str
+    js_rendered: bool
+    host: str = ""
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}/site/{self.id}/"
+
+
+@dataclass
+class World:
+    locations: List[tuple]
+    sites: List[Site] = field(default_factory=list)
+    by_postcode: Dict[str, List[Site]] = field(default_factory=dict)
+
+    def sites_for_query(self, query: str, max_results: int) -> List[Site]:
+        """The sites a search for `query` finds: a stable pick from its location"""
+        for location, postcode in self.locations:
+            if postcode in query or location.lower() in query.lower():
+                candidates = self.by_postcode[postcode]
+                start = stable_hash(query) % len(candidates)
+                return [
+                    candidates[(start + i) % len(candidates)]
+                    for i in range(min(max_results, len(candidates)))
+                ]
+        return []
+
+
+def build_world(
+    locations: int, sites_per_location: int, js_ratio: float, port: int
+) -> World:
+    """`locations` suburbs with `sites_per_location` business sites each.
+
+    Sites are spread over loopback addresses 127.0.0.2-127.0.0.201 so the
+    crawler's per-host politeness sees many hosts, as it would on the web.
+    """
+    world = World(
+        locations=[
+            (SUBURBS[i % len(SUBURBS)] + ("" if i < len(SUBURBS) else f" {i}"), str(2000 + i))
+            for i in range(locations)
+        ]
+    )
+    site_id = 0
+    for location, postcode in world.locations:
+        world.by_postcode[postcode] = []
+        for n in range(sites_per_location):
+            activity = ACTIVITIES[n % len(ACTIVITIES)]
+            name = f"{location} {activity} {n}"
+            slug = name.lower().replace(" ", "")
+            site = Site(
+                id=site_id,
+                location=location,
+                postcode=postcode,
+                name=name,
+                address=f"{10 + n} {STREETS[n % len(STREETS)]}, {location.upper()} NSW {postcode}",
+                phone=f"(02) 9{stable_hash(name) % 1000:03d} {stable_hash(name, 1) % 10000:04d}",
+                email=f"hello@{slug}.com.au",
+                js_rendered=(stable_hash(name, "js") % 1000) < js_ratio * 1000,
+                host=f"127.0.0.{2 + site_id % 200}:{port}",
+            )
+            world.sites.append(site)
+            world.by_postcode[postcode].append(site)
+            site_id += 1
+    return world
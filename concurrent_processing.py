@@ -1,16 +1,123 @@
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
 
+from logger_config import get_logger
+from metrics import FAILURES, IN_FLIGHT, STAGE_LATENCY
 
-class concurrent_result:
-    def __init__(self, max_workers: int):
-        self.max_workers = max_workers
+logger = get_logger("prospects")
 
-    def get_urls(self, func, queries, *args, **kwargs):
-        data = args[0]
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            print(queries)
-            results = executor.map(func, queries)
 
-        # Collect results as they complete
-        for result in results:
-            data.extend(result)
+class BoundedRunner:
+    """Run `func(item)` as asyncio tasks with at most `limit` in flight.
+
+    A failing item yields `on_error(item, exc)` (by default `{"error": ...}`)
+    instead of raising, so one bad item never cancels the rest. Per-host
+    limits on crawling are kept by the HostScheduler, not here.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Awaitable],
+        limit: int,
+        on_error: Optional[Callable] = None,
+    ):
+        self.func = func
+        self.on_error = on_error
+        self._semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(self, item):
+        try:
+            async with self._semaphore:
+                return await self.func(item)
+        except Exception as e:
+            logger.warning("Error processing %s: %s", item, e)
+            if self.on_error is not None:
+                return self.on_error(item, e)
+            return {"error": str(e)}
+
+    def submit(self, item) -> asyncio.Task:
+        return asyncio.create_task(self.run(item))
+
+
+async def bounded_gather(
+    func: Callable[..., Awaitable],
+    items: List,
+    limit: int,
+    on_error: Optional[Callable] = None,
+) -> List:
+    """Run `func` over `items` through a BoundedRunner, results in input order"""
+    runner = BoundedRunner(func, limit, on_error)
+    return await asyncio.gather(*(runner.submit(item) for item in items))
+
+
+# Put on a stage queue to say no more items will follow
+STAGE_DONE = object()
+
+
+async def _take(inbox: asyncio.Queue, batch_size: int) -> Tuple[List, bool]:
+    """Wait for one item, then take whatever else is ready up to `batch_size`"""
+    item = await inbox.get()
+    if item is STAGE_DONE:
+        return [], True
+    items = [item]
+    while len(items) < batch_size:
+        try:
+            item = inbox.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if item is STAGE_DONE:
+            return items, True
+        items.append(item)
+    return items, False
+
+
+async def drain(inbox: asyncio.Queue) -> List:
+    """Every item put on `inbox` until it is closed"""
+    items = []
+    while True:
+        item = await inbox.get()
+        if item is STAGE_DONE:
+            return items
+        items.append(item)
+
+
+async def run_stage(
+    name: str,
+    handle: Callable[..., Awaitable],
+    inbox: asyncio.Queue,
+    outbox: Optional[asyncio.Queue] = None,
+    workers: int = 1,
+    batch_size: Optional[int] = None,
+):
+    """Consume `inbox` with `workers` tasks until it is closed, then close `outbox`.
+
+    `handle(item)` - or `handle(items)` with up to `batch_size` ready items
+    when `batch_size` is set - returns the outputs to pass downstream (or
+    None). Putting onto a bounded `outbox` waits for the next stage, which is
+    what keeps a fast stage from running ahead. A failing item is logged and
+    dropped so it never stops the stage. In-flight work and failures are
+    reported under the stage's `name`.
+    """
+
+    async def worker():
+        while True:
+            items, closed = await _take(inbox, batch_size or 1)
+            if items:
+                try:
+                    with IN_FLIGHT.track(stage=name), STAGE_LATENCY.time(stage=name):
+                        outputs = await handle(items if batch_size else items[0])
+                except Exception as e:
+                    logger.warning("Error in %s stage for %s: %s", name, items, e)
+                    FAILURES.inc(stage=name, type=type(e).__name__)
+                    outputs = None
+                if outbox is not None:
+                    for output in outputs or ():
+                        await outbox.put(output)
+            if closed:
+                # Hand the marker on to the sibling workers
+                inbox.put_nowait(STAGE_DONE)
+                return
+
+    await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+    if outbox is not None:
+        await outbox.put(STAGE_DONE)
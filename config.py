@@ -1,4 +1,5 @@
-from typing import Annotated
+from functools import lru_cache
+from typing import Annotated, Dict
 from pydantic_settings import BaseSettings
 
 from pydantic.functional_validators import AfterValidator
@@ -20,3 +21,99 @@ class Settings(BaseSettings):
     # OPENAI_API_KEY: str
     ANTHROPIC: str
     TAVILY: str
+
+    # Browser pool
+    BROWSER_POOL_SIZE: int = 2  # number of warm browsers kept open
+    BROWSER_MAX_PAGES: int = 4  # concurrent pages lent out per browser
+    BROWSER_MAX_USES: int = 50  # recycle a browser after this many pages
+
+    # Concurrency
+    CRAWL_CONCURRENCY: int = 8  # pages crawled at once across all hosts
+    ENRICH_CONCURRENCY: int = 4  # prospects enriched at once
+    EXTRACT_CONCURRENCY: int = 4  # pages sent to Claude at once
+    PIPELINE_QUEUE_SIZE: int = 32  # items buffered between two pipeline stages
+
+    # Page pre-filtering before extraction
+    EXTRACTION_CHUNK_TOKENS: int = 3000  # input budget per Claude call
+    EXTRACTION_PAGE_TOKENS: int = 12000  # input budget across one page's chunks
+    POSTCODE_DATA_PATH: str = "data/au_postcodes.csv"  # see postcodes.py
+    POSTCODE_RADIUS_KM: float = 10.0  # postcodes this close count as nearby
+    NEARBY_POSTCODE_RANGE: int = 10  # numeric fallback for postcodes without data
+
+    # Extraction mode: "single" (one call per chunk), "packed" (several chunks
+    # per call) or "batch" (packed calls through the Message Batches API)
+    EXTRACTION_MODE: str = "single"
+    BATCH_MAX_TOKENS: int = 8000  # input budget of one packed request
+    BATCH_MAX_PAGES: int = 6  # chunks packed into one request
+    BATCH_BACKEND: str = "local"  # "anthropic" or "local" (runs requests directly)
+    BATCH_POLL_INTERVAL: float = 30.0  # seconds between batch status checks
+
+    # Anthropic quota (per minute) shared by every Claude call
+    ANTHROPIC_RPM: int = 50
+    ANTHROPIC_INPUT_TPM: int = 50000
+    ANTHROPIC_OUTPUT_TPM: int = 10000
+    ANTHROPIC_MAX_RETRIES: int = 5
+    ANTHROPIC_OUTPUT_ESTIMATE: int = 600  # output reserved per call until replies are seen
+    ANTHROPIC_TIMEOUT: float = 120.0  # seconds per Claude request
+    ANTHROPIC_MAX_CONNECTIONS: int = 16  # pooled connections to the Claude API
+
+    # Tavily search
+    TAVILY_BASE_URL: str = "https://api.tavily.com"
+    SEARCH_CONCURRENCY: int = 8  # queries searched at once
+    TAVILY_TIMEOUT: float = 30.0  # seconds per search request
+    TAVILY_MAX_CONNECTIONS: int = 8  # pooled connections to the Tavily API
+
+    # Persistent caches
+    CACHE_DIR: str = ".cache"
+    SEARCH_CACHE_TTL: int = 24 * 60 * 60  # seconds a Tavily result stays fresh
+    SEARCH_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # compressed Claude answers kept
+    PAGE_CACHE_ENABLED: bool = True  # reuse and revalidate crawled pages
+    PAGE_CACHE_TTL: int = 7 * 24 * 60 * 60  # seconds a crawled page stays fresh
+    # Per-domain overrides, e.g. {"eventbrite.com.au": 3600}; subdomains included
+    PAGE_CACHE_DOMAIN_TTLS: Dict[str, int] = {}
+    PAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # compressed pages kept on disk
+
+    # Background jobs
+    JOB_WORKERS: int = 2  # location scans run at once
+    JOB_STORE_PATH: str = ".data/jobs.sqlite"
+
+    # Firestore (set FIRESTORE_EMULATOR_HOST to use the emulator instead)
+    FIREBASE_CREDENTIALS: str = "./getstrollr-46a44d10fddf.json"
+    FIREBASE_PROJECT_ID: str = "getstrollr"
+
+    # Firestore writes
+    FIRESTORE_BATCH_SIZE: int = 500  # documents per batched write (max 500)
+    FIRESTORE_WRITE_CONCURRENCY: int = 4  # batches committed at once
+    PROSPECT_REFRESH_DAYS: int = 30  # complete prospects younger than this are not re-enriched
+
+    # Plain HTTP requests (contact page probes and non-browser fetches)
+    HTTP_TIMEOUT: float = 10.0  # seconds per request
+    HTTP_MAX_CONNECTIONS: int = 32
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # seconds an idle pooled connection is kept
+    HTTP2_ENABLED: bool = True  # used by every pooled client (needs h2, in requirements.txt)
+    PLAIN_FETCH_ENABLED: bool = True  # try a plain fetch before the browser
+    PLAIN_FETCH_MIN_TEXT: int = 200  # less visible text than this means render it
+
+    # Politeness towards crawled hosts
+    HOST_CONCURRENCY: int = 2  # requests in flight to one host
+    HOST_MIN_INTERVAL: float = 1.0  # seconds between request starts on one host
+    HOST_MAX_CRAWL_DELAY: float = 10.0  # cap on a robots.txt Crawl-delay
+    RESPECT_ROBOTS_TXT: bool = True
+    ROBOTS_CACHE_TTL: int = 60 * 60  # seconds a robots.txt stays cached
+    ROBOTS_CACHE_MAX_ENTRIES: int = 5000
+
+    # Logging
+    LOG_LEVEL: str = "INFO"  # payload dumps are logged at DEBUG
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_PAYLOAD_CHARS: int = 500  # longer strings in log arguments are cut
+    LOG_PAYLOAD_ITEMS: int = 20  # longer lists/dicts in log arguments are cut
+
+    # Startup
+    STARTUP_PREWARM: bool = True  # load the pipeline and browsers after startup
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment and .env once"""
+    return Settings()
@@ -1,12 +1,22 @@
+import os
+import re
 import json
+import httpx
 import asyncio
-from anthropic import Anthropic
+import hashlib
+from typing import AsyncIterator, List, Optional
 import typing_extensions as typing
 
-from config import Settings
-from tavily import TavilyClient
+from config import get_settings
+from logger_config import get_logger
+from anthropic_client import get_anthropic_client
+from http_client import http2_enabled
+from metrics import FAILURES, SEARCH_LATENCY
+from rate_limiter import create_message
+from sqlite_cache import SQLiteCache
 
-settings = Settings()
+settings = get_settings()
+logger = get_logger("prospects")
 
 query_gen_prompt = """Generate 2 precise and targeted search queries to find current, active kids activities and programs in {location} (postcode: {postcode}). 
 
@@ -78,8 +88,8 @@ class OutputFormat(typing.TypedDict):
     query: str
 
 
-async def query_generation(location: str, postcode: str):
-    client = Anthropic(api_key=str(settings.ANTHROPIC))
+async def query_generation(location: str, postcode: str, client=None):
+    client = client or get_anthropic_client()
 
     keywords = [
         "Arts & Crafts",
@@ -114,7 +124,8 @@ async def query_generation(location: str, postcode: str):
     )
 
     # Use Claude to generate content
-    message = client.messages.create(
+    message = await create_message(
+        client,
         model="claude-3-haiku-20240307",
         max_tokens=1024,
         temperature=0.7,
@@ -125,31 +136,119 @@ async def query_generation(location: str, postcode: str):
     return json.loads(message.content[0].text)
 
 
-def process_query(query):
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    response = loop.run_until_complete(get_relevant_urls(query))
-    loop.close()
-    return [url.get("url") for url in response.get("results", [])]
-
-
-async def get_relevant_urls(query: str):
-    # Step 1. Instantiating your TavilyClient
-    tavily_client = TavilyClient(api_key=settings.TAVILY)
-
-    # Step 2. Executing a simple search query
-    response = tavily_client.search(
-        query=query,
-        search_depth="basic",  # basic deduct 1 api credit, advanced deduct 2 API credits
-        include_answer=False,
-        include_images=False,
-        include_image_descriptions=False,
-        include_raw_content=False,
-        max_results=2,
-        include_domains=[],
-        exclude_domains=[],  # exclude social media sites
-    )
-
-    # Step 3. That's it! You've done a Tavily Search!
-    # print(response)
-    return response
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_tavily_http_client() -> httpx.AsyncClient:
+    """One pooled HTTP client for every Tavily search in the process"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=settings.TAVILY_BASE_URL,
+            headers={"Content-Type": "application/json"},
+            http2=http2_enabled(),
+            timeout=settings.TAVILY_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.TAVILY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.TAVILY_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _http_client
+
+
+async def close_tavily_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+_search_cache: Optional[SQLiteCache] = None
+
+
+def get_search_cache() -> SQLiteCache:
+    """On-disk cache of Tavily responses shared by every request"""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SQLiteCache(
+            os.path.join(settings.CACHE_DIR, "tavily.sqlite"),
+            ttl=settings.SEARCH_CACHE_TTL,
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        )
+    return _search_cache
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query or "").strip().lower()
+
+
+def search_cache_key(payload: dict) -> str:
+    key = {
+        "query": normalize_query(payload["query"]),
+        "search_depth": payload["search_depth"],
+        "max_results": payload["max_results"],
+        "include_domains": sorted(payload["include_domains"]),
+        "exclude_domains": sorted(payload["exclude_domains"]),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+async def get_relevant_urls(
+    query: str, client: Optional[httpx.AsyncClient] = None
+):
+    # Same search parameters the TavilyClient call used, sent over the pooled client
+    payload = {
+        "api_key": settings.TAVILY,
+        "query": query,
+        "search_depth": "basic",  # basic deduct 1 api credit, advanced deduct 2 API credits
+        "include_answer": False,
+        "include_images": False,
+        "include_image_descriptions": False,
+        "include_raw_content": False,
+        "max_results": 2,
+        "include_domains": [],
+        "exclude_domains": [],  # exclude social media sites
+    }
+
+    cache = get_search_cache()
+    cache_key = search_cache_key(payload)
+    cached = await cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with SEARCH_LATENCY.time():
+        client = client or get_tavily_http_client()
+        response = await client.post("/search", json=payload)
+    response.raise_for_status()
+    result = response.json()
+    await cache.set(cache_key, result)
+    return result
+
+
+async def search_urls(
+    queries: List[str],
+    concurrency: int = settings.SEARCH_CONCURRENCY,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncIterator[List[str]]:
+    """Search every query concurrently, yielding each query's urls as it completes"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def search(query: str) -> List[str]:
+        async with semaphore:
+            try:
+                response = await get_relevant_urls(query, client)
+            except Exception as e:
+                logger.warning("Error searching %s: %s", query, e)
+                FAILURES.inc(stage="search", type=type(e).__name__)
+                return []
+        return [url.get("url") for url in response.get("results", [])]
+
+    tasks = [asyncio.create_task(search(query)) for query in queries]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # The consumer stopped early; don't leave searches running
+        for task in tasks:
+            task.cancel()
@@ -1,8 +1,42 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import os
+import asyncio
+import re
+import hashlib
+from typing import Dict, List
+from urllib.parse import urlparse
 
+from config import get_settings
+from logger_config import get_logger
+from metrics import FAILURES, FIRESTORE_WRITE_LATENCY
 
-cred = credentials.Certificate("./getstrollr-46a44d10fddf.json")
+settings = get_settings()
+logger = get_logger("prospects")
+
+# Firestore rejects batched writes with more than 500 operations
+MAX_BATCH_SIZE = 500
+
+
+def prospect_key(data: dict) -> str:
+    """Deterministic document id for a prospect.
+
+    Uses the normalized business name plus the website domain, or the phone
+    number when there is no website, so re-scans land on the same document.
+    Fields a later scan may fill in (the postcode, say) are left out.
+    """
+    name = re.sub(r"[^a-z0-9]+", " ", (data.get("business_name") or "").lower())
+    name = " ".join(name.split())
+    domain = urlparse(data.get("website_link") or "").netloc.lower()
+    if domain.startswith("www."):
+        domain = domain[4:]
+    phone = re.sub(r"\D", "", data.get("phone_number") or "")
+
+    if domain:
+        raw = f"domain:{name}|{domain}"
+    elif phone:
+        raw = f"phone:{name}|{phone}"
+    else:
+        raw = f"name:{name}|{(data.get('address') or '').strip().lower()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 class db:
@@ -10,11 +44,26 @@ class db:
     __initialized = False
 
     def __init__(self):
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            # The emulator needs no service account
+            from google.auth.credentials import AnonymousCredentials
+            from google.cloud import firestore as cloud_firestore
+
+            self.__db = cloud_firestore.Client(
+                project=settings.FIREBASE_PROJECT_ID,
+                credentials=AnonymousCredentials(),
+            )
+            return
+        # firebase_admin pulls in the whole Google Cloud client, so load it on use
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         if not db.__initialized:
+            cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS)
             firebase_admin.initialize_app(cred, name="default")
             db.__initialized = True
         self.__db = firestore.client()
-        print("connected to firestore")
+        logger.debug("Connected to firestore")
 
     # async def add_data(self, collection_name, data_name, data):
     #     try:
@@ -42,9 +91,137 @@ class db:
             return False
 
         try:
-            self.__db.collection(collection_name).add(data)
+            # The client is blocking, keep it off the event loop
+            await asyncio.to_thread(self.__db.collection(collection_name).add, data)
             return True
 
         except Exception as e:
-            print(f"Unexpected error: {e}")
+            logger.warning("Unexpected error: %s", e)
             return False
+
+    async def _write_batches(
+        self, collection_name: str, items: List, write_one
+    ) -> List[dict]:
+        """Commit `write_one(batch, collection, item) -> doc id` for every item.
+
+        Items are grouped into batches of at most FIRESTORE_BATCH_SIZE (capped
+        at Firestore's 500 limit) and up to FIRESTORE_WRITE_CONCURRENCY batches
+        are committed at once, off the event loop. Returns one
+        {"id", "success", "error"} dict per item, in order. A batch commits
+        atomically, so a failed commit fails all of its items.
+        """
+        if not self.__db:
+            return [
+                {"id": None, "success": False, "error": "Not connected"}
+                for _ in items
+            ]
+
+        collection = self.__db.collection(collection_name)
+        size = max(1, min(settings.FIRESTORE_BATCH_SIZE, MAX_BATCH_SIZE))
+        semaphore = asyncio.Semaphore(settings.FIRESTORE_WRITE_CONCURRENCY)
+
+        def commit(chunk: List) -> List[str]:
+            batch = self.__db.batch()
+            ids = [write_one(batch, collection, item) for item in chunk]
+            batch.commit()
+            return ids
+
+        async def write(chunk: List) -> List[dict]:
+            async with semaphore:
+                try:
+                    with FIRESTORE_WRITE_LATENCY.time():
+                        ids = await asyncio.to_thread(commit, chunk)
+                    return [{"id": i, "success": True, "error": None} for i in ids]
+                except Exception as e:
+                    logger.warning("Error committing batch: %s", e)
+                    FAILURES.inc(stage="firestore", type=type(e).__name__)
+                    return [
+                        {"id": None, "success": False, "error": str(e)} for _ in chunk
+                    ]
+
+        chunks = [items[i : i + size] for i in range(0, len(items), size)]
+        results = await asyncio.gather(*(write(chunk) for chunk in chunks))
+        return [result for chunk_results in results for result in chunk_results]
+
+    async def add_many(self, collection_name: str, documents: List[dict]) -> List[dict]:
+        """Add many documents as new records using concurrent batched writes.
+
+        Args:
+            collection_name: Name of the collection
+            documents: List of dictionaries containing the document data
+
+        Returns:
+            list: One {"id", "success", "error"} dict per document, in order
+        """
+
+        def write_one(batch, collection, data: dict) -> str:
+            doc_ref = collection.document()
+            batch.set(doc_ref, data)
+            return doc_ref.id
+
+        return await self._write_batches(collection_name, documents, write_one)
+
+    async def get_many(self, collection_name: str, doc_ids: List[str]) -> Dict[str, dict]:
+        """Fetch existing documents by id in one round-trip.
+
+        Args:
+            collection_name: Name of the collection
+            doc_ids: Document ids to look up
+
+        Returns:
+            dict: Document data by id, for the ids that exist
+        """
+        if not self.__db or not doc_ids:
+            return {}
+
+        collection = self.__db.collection(collection_name)
+        refs = [collection.document(doc_id) for doc_id in set(doc_ids)]
+
+        def fetch() -> Dict[str, dict]:
+            return {
+                snapshot.id: snapshot.to_dict()
+                for snapshot in self.__db.get_all(refs)
+                if snapshot.exists
+            }
+
+        try:
+            return await asyncio.to_thread(fetch)
+        except Exception as e:
+            logger.warning("Error fetching documents: %s", e)
+            return {}
+
+    async def upsert_many(
+        self, collection_name: str, documents: Dict[str, dict]
+    ) -> List[dict]:
+        """Create or merge-update documents under deterministic ids.
+
+        Only the given fields are written, so unchanged fields of an existing
+        document are left alone.
+
+        Args:
+            collection_name: Name of the collection
+            documents: Fields to write, keyed by document id
+
+        Returns:
+            list: One {"id", "success", "error"} dict per document
+        """
+
+        def write_one(batch, collection, item) -> str:
+            doc_id, data = item
+            batch.set(collection.document(doc_id), data, merge=True)
+            return doc_id
+
+        return await self._write_batches(
+            collection_name, list(documents.items()), write_one
+        )
+
+
+_db = None
+
+
+def get_db() -> db:
+    """The process-wide Firestore client, connected on first use"""
+    global _db
+    if _db is None:
+        _db = db()
+    return _db
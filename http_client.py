@@ -0,0 +1,50 @@
+from typing import TYPE_CHECKING, Optional
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    import httpx
+
+settings = get_settings()
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def http2_enabled() -> bool:
+    """HTTP2_ENABLED, as far as it is supported: httpx needs the optional h2 package"""
+    if not settings.HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """One pooled HTTP client for plain (non-browser) page requests"""
+    global _client
+    if _client is None:
+        import httpx
+
+        _client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            http2=http2_enabled(),
+            timeout=settings.HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
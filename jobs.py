@@ -0,0 +1,302 @@
+import os
+import json
+import uuid
+import sqlite3
+import asyncio
+import threading
+from time import time
+from typing import List, Optional, Tuple
+
+from config import get_settings
+from logger_config import get_logger, log_context
+
+settings = get_settings()
+
+logger = get_logger("prospects")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+    """Location scan jobs persisted in SQLite so they survive a restart"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                location TEXT NOT NULL,
+                postcode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                results TEXT NOT NULL,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )"""
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "locations" not in columns:
+            # Bulk jobs: a JSON list of [location, postcode] pairs
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN locations TEXT")
+        # One row per prospect, so recording a result never rewrites the others
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS job_results (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                postcode TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            )"""
+        )
+        self._conn.commit()
+
+    def create_sync(
+        self, location: str, postcode: str, locations: Optional[List[tuple]] = None
+    ) -> str:
+        job_id = uuid.uuid4().hex
+        now = time()
+        results = "{}" if locations else "[]"
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, location, postcode, status, stages, results, "
+                "error, created, updated, locations) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    location,
+                    postcode,
+                    QUEUED,
+                    "{}",
+                    results,
+                    None,
+                    now,
+                    now,
+                    json.dumps(locations) if locations else None,
+                ),
+            )
+            self._conn.commit()
+        return job_id
+
+    def add_results_sync(self, job_id: str, results: List[Tuple[Optional[str], dict]]):
+        """Append (postcode, prospect) results to a job"""
+        with self._lock:
+            (start,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM job_results WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT INTO job_results (job_id, seq, postcode, data) VALUES (?, ?, ?, ?)",
+                [
+                    (job_id, start + i, postcode, json.dumps(data))
+                    for i, (postcode, data) in enumerate(results)
+                ],
+            )
+            self._conn.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time(), job_id))
+            self._conn.commit()
+
+    def clear_results_sync(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def update_sync(self, job_id: str, **fields):
+        for key in ("stages", "results"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        fields["updated"] = time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._conn.commit()
+
+    def get_sync(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, location, postcode, status, stages, results, error, "
+                "created, updated, locations FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            result_rows = self._conn.execute(
+                "SELECT postcode, data FROM job_results WHERE job_id = ? ORDER BY seq",
+                (job_id,),
+            ).fetchall()
+        locations = json.loads(row[9]) if row[9] else None
+        # Jobs stored before job_results keep their results inline
+        results = json.loads(row[5])
+        if locations:
+            # Bulk results are grouped by the postcode each prospect belongs to
+            results = {code: [] for _, code in locations} | results
+            for postcode, data in result_rows:
+                results.setdefault(postcode, []).append(json.loads(data))
+        else:
+            results.extend(json.loads(data) for _, data in result_rows)
+        return {
+            "id": row[0],
+            "location": row[1],
+            "postcode": row[2],
+            "status": row[3],
+            "stages": json.loads(row[4]),
+            "results": results,
+            "error": row[6],
+            "created": row[7],
+            "updated": row[8],
+            "locations": locations,
+        }
+
+    def unfinished_sync(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    async def create(
+        self, location: str, postcode: str, locations: Optional[List[tuple]] = None
+    ) -> str:
+        return await asyncio.to_thread(self.create_sync, location, postcode, locations)
+
+    async def add_results(self, job_id: str, results: List[Tuple[Optional[str], dict]]):
+        await asyncio.to_thread(self.add_results_sync, job_id, results)
+
+    async def clear_results(self, job_id: str):
+        await asyncio.to_thread(self.clear_results_sync, job_id)
+
+    async def update(self, job_id: str, **fields):
+        await asyncio.to_thread(self.update_sync, job_id, **fields)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.get_sync, job_id)
+
+    async def unfinished(self) -> List[str]:
+        return await asyncio.to_thread(self.unfinished_sync)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobQueue:
+    """Runs submitted location scans on a fixed number of background workers.
+
+    Progress and partial results are written to the JobStore as pipeline
+    events arrive. Jobs still queued or running when the process stops are
+    picked up again from the start by the next `start()`; the search and
+    Claude caches make the repeated stages cheap.
+    """
+
+    def __init__(self, store: JobStore, workers: int = settings.JOB_WORKERS):
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        for job_id in await self.store.unfinished():
+            logger.info("Resuming job %s", job_id)
+            self._queue.put_nowait(job_id)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def submit(self, location: str, postcode: str) -> str:
+        job_id = await self.store.create(location, postcode)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def submit_bulk(self, locations: List[tuple]) -> str:
+        """Queue one combined scan of many (location, postcode) pairs"""
+        locations = list(dict.fromkeys((name, code) for name, code in locations))
+        job_id = await self.store.create("", "", locations)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            with log_context(job_id=job_id):
+                try:
+                    await self._run(job_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error("Job %s failed: %s", job_id, e)
+                    await self.store.update(job_id, status=FAILED, error=str(e))
+                finally:
+                    self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        from pipeline import run_pipeline, scan_locations
+
+        job = await self.store.get(job_id)
+        if job is None:
+            return
+
+        stages = {}
+        bulk = bool(job["locations"])
+        if bulk:
+            events = scan_locations([tuple(pair) for pair in job["locations"]])
+        else:
+            events = run_pipeline(job["location"], job["postcode"])
+        # A resumed job starts over, so drop what its last run recorded
+        await self.store.clear_results(job_id)
+        empty = {} if bulk else []
+        await self.store.update(
+            job_id, status=RUNNING, stages=stages, results=empty, error=None
+        )
+        async for event in events:
+            name = event["event"]
+            if name == "prospect":
+                postcode = event["postcode"] if bulk else None
+                await self.store.add_results(job_id, [(postcode, event["data"])])
+            elif name == "done":
+                stages[name] = {k: v for k, v in event.items() if k != "event"}
+                await self.store.update(job_id, status=DONE, stages=stages)
+            else:
+                stages[name] = {k: v for k, v in event.items() if k != "event"}
+                await self.store.update(job_id, stages=stages)
+
+    async def close(self):
+        # Running jobs stay "running" in the store and resume on the next start
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(JobStore(settings.JOB_STORE_PATH))
+    return _job_queue
+
+
+async def start_job_queue() -> JobQueue:
+    queue = get_job_queue()
+    await queue.start()
+    return queue
+
+
+async def close_job_queue():
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.close()
+        _job_queue.store.close()
+        _job_queue = None
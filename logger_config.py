@@ -99,15 +99,128 @@
 
 
 import os
+import copy
+import json
+import atexit
 import logging
 import shutil
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from queue import SimpleQueue
+from typing import Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+# Fields (request_id, job_id, ...) attached to every record logged in this context
+_log_context: ContextVar[dict] = ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """Tag every record logged inside the block (and tasks it starts) with `fields`"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def truncate(value, limit: Optional[int] = None, items: Optional[int] = None):
+    """A cheap-to-format copy of `value` with long strings and collections cut short"""
+    limit = settings.LOG_PAYLOAD_CHARS if limit is None else limit
+    items = settings.LOG_PAYLOAD_ITEMS if items is None else items
+    if isinstance(value, str):
+        if len(value) <= limit:
+            return value
+        return f"{value[:limit]}... [{len(value) - limit} more chars]"
+    if isinstance(value, dict):
+        shown = {
+            key: truncate(item, limit, items)
+            for key, item in list(value.items())[:items]
+        }
+        if len(value) > items:
+            shown["..."] = f"{len(value) - items} more keys"
+        return shown
+    if isinstance(value, (list, tuple, set)):
+        shown = [truncate(item, limit, items) for item in list(value)[:items]]
+        if len(value) > items:
+            shown.append(f"... {len(value) - items} more items")
+        return shown
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the record's log context"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "function": record.funcName,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFormatter(logging.Formatter):
+    """The plain text format with the record's log context appended"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        context = getattr(record, "context", {})
+        if context:
+            message += " " + " ".join(f"{k}={v}" for k, v in context.items())
+        return message
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Hands records to the listener thread after a cheap, bounded formatting.
+
+    The log context is captured here, on the calling task, and payload
+    arguments are truncated before the message is built so large markdown or
+    result lists never get fully formatted on the event loop. A traceback is
+    kept in `exc_text` rather than folded into the message, so the listener's
+    formatter can place it (JsonFormatter's "exception" field).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.context = _log_context.get()
+        if isinstance(record.args, dict):
+            record.args = truncate(record.args)
+        elif record.args:
+            record.args = tuple(truncate(arg) for arg in record.args)
+
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = (self.formatter or logging.Formatter()).formatException(
+                record.exc_info
+            )
+        # The copy QueueHandler.prepare makes, without folding exc_text into msg
+        record = copy.copy(record)
+        record.message = record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
 
 
 class CustomLogger:
     _instance = None
     _logger = None
+    _listener = None
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -163,7 +276,11 @@ class CustomLogger:
             print(f"Error during log cleanup: {str(e)}")
 
     def _setup_logger(self):
-        """Configure and return a logger instance"""
+        """Configure and return a logger instance.
+
+        Records are put on an in-memory queue; a listener thread does the file
+        and console I/O so logging never blocks the event loop.
+        """
         if CustomLogger._logger is not None:
             return
 
@@ -171,25 +288,41 @@ class CustomLogger:
             # Run cleanup before setting up new logs
             self.cleanup_old_logs()
 
+            if settings.LOG_FORMAT == "json":
+                formatter = JsonFormatter()
+            else:
+                formatter = ContextFormatter(self.log_format)
+            handlers = [
+                RotatingFileHandler(
+                    self.LOG_FILE_PATH,
+                    maxBytes=self.MAX_LOG_SIZE,
+                    backupCount=self.MAX_LOG_FILES,
+                    encoding="utf-8",
+                ),
+                logging.StreamHandler(),
+            ]
+            for handler in handlers:
+                handler.setFormatter(formatter)
+
+            log_queue = SimpleQueue()
+            CustomLogger._listener = QueueListener(
+                log_queue, *handlers, respect_handler_level=True
+            )
+            CustomLogger._listener.start()
+            atexit.register(CustomLogger._listener.stop)
+
+            # Only the message is built on the caller; the listener formats the rest
+            queue_handler = _ContextQueueHandler(log_queue)
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
             # Setup logging configuration
             logging.basicConfig(
-                level=logging.INFO,
-                format=self.log_format,
-                handlers=[
-                    RotatingFileHandler(
-                        self.LOG_FILE_PATH,
-                        maxBytes=self.MAX_LOG_SIZE,
-                        backupCount=self.MAX_LOG_FILES,
-                        encoding="utf-8",
-                    ),
-                    logging.StreamHandler(),
-                ],
-                force=True,
+                level=settings.LOG_LEVEL, handlers=[queue_handler], force=True
             )
 
             CustomLogger._logger = logging.getLogger(self.project_name)
             CustomLogger._logger.info("Logging initialized successfully")
-            CustomLogger._logger.info(f"Log file created at: {self.LOG_FILE_PATH}")
+            CustomLogger._logger.info("Log file created at: %s", self.LOG_FILE_PATH)
 
         except Exception as e:
             print(f"Error setting up logging: {str(e)}")
@@ -1,24 +1,90 @@
+from time import perf_counter
+
+_import_started = perf_counter()
+
 import os
+import sys
 import json
-import uvicorn
+import uuid
+import asyncio
+import importlib
+from typing import List
 from pydantic import BaseModel
-from time import perf_counter, sleep
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from firebase import db
-from config import Settings
-from logger_config import get_logger
-from crawler.tavily import process_query
-from crawler.tavily import query_generation
-from scrapper.crawlai_scrapper import scrapper
-from concurrent_processing import concurrent_result
+from config import get_settings
+from metrics import STARTUP_SECONDS, render as render_metrics
+from jobs import get_job_queue, start_job_queue, close_job_queue
+from logger_config import get_logger, log_context
+from http_client import close_http_client
+from anthropic_client import get_anthropic_client, close_anthropic_client
+from scrapper.browser_pool import start_browser_pool, close_browser_pool
 
-settings = Settings()
+settings = get_settings()
 
 logger = get_logger("prospects")
 
+STARTUP_SECONDS.set(perf_counter() - _import_started, phase="import")
+
+
+async def prewarm():
+    """Load the pipeline's heavy dependencies, build its API clients and
+    launch the browsers.
 
-app = FastAPI()
+    Runs after startup so /health answers straight away; the import happens
+    in a thread to keep the event loop serving requests meanwhile.
+    """
+    try:
+        await asyncio.to_thread(importlib.import_module, "pipeline")
+        from crawler.tavily import get_tavily_http_client
+
+        get_anthropic_client()
+        get_tavily_http_client()
+        # Keep warm browsers around for the whole process instead of one per page
+        await start_browser_pool()
+    except Exception as e:
+        logger.warning("Prewarm failed, continuing cold: %s", e)
+        return
+    elapsed = perf_counter() - _import_started
+    STARTUP_SECONDS.set(elapsed, phase="prewarm")
+    logger.info("Prewarmed pipeline and browser pool after %.3fs", elapsed)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_job_queue()
+    warming = asyncio.create_task(prewarm()) if settings.STARTUP_PREWARM else None
+    ready = perf_counter() - _import_started
+    STARTUP_SECONDS.set(ready, phase="ready")
+    logger.info("Ready after %.3fs", ready)
+    yield
+    if warming is not None:
+        warming.cancel()
+        await asyncio.gather(warming, return_exceptions=True)
+    await close_job_queue()
+    await close_browser_pool()
+    if "crawler.tavily" in sys.modules:
+        from crawler.tavily import close_tavily_http_client
+
+        await close_tavily_http_client()
+    await close_anthropic_client()
+    await close_http_client()
+    logger.info("Shut down")
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag the request's log records (including streamed work) with its id"""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    with log_context(request_id=request_id):
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 
 class LocationRequest(BaseModel):
@@ -26,263 +92,109 @@ class LocationRequest(BaseModel):
     postcode: str
 
 
-# Take the address and postcode from the user
-# Validate the address and postcode
-# Generate the queries
-# Fetch the exclusion list from the db and send to the tavily or think the other way for doing exclusion list
-# loop the queries and send each query to the tavily api
-# Get the relevant urls
-# Loop through the urls and crawl the dynamic content
-# Crawl scrape the content if the data is relevant and related ( may be apply some agentic behaviour)
-# Extract Based on postcode and location
-# Get the final structured data
-# Return the final structured data
-# store the final
-
-process = concurrent_result(12)
+class BulkLocationRequest(BaseModel):
+    locations: List[LocationRequest]
 
 
 @app.post("/process-location")
 async def process_location(request: LocationRequest):
-    try:
-        ex_start = perf_counter()
+    from pipeline import run_pipeline
 
+    try:
         # step 1 : Take input from user
         location = request.location
         postcode = request.postcode
 
-        # step 2 : Generate queries
-        queries = await query_generation(location=location, postcode=postcode)
-        print("-------------> generated queries", queries)
-        logger.info(f"Generated queries: {queries}")
-
-        # step 3 : Get relevant urls from tavily
-        urls = []
-
-        process.get_urls(process_query, queries, urls)  # multiprocessing
-        print(f"URL ======>>>>> {urls}")
-        logger.info(f"URL ======>>>>> {urls}")
-
-        content_list = []
-
-        # step 4 : Scrape data from all urls and store it in a list
-        for url in urls:
-            markdown_content = await scrapper.crawl_dynamic_content(url)
-            if not markdown_content.get("error"):
-                content_list.append(markdown_content)
-            # else:
-            #     print(f"Error crawling {url}: {markdown_content.get('error')}")
-            #     continue
-
-        print("-------------> content_list", len(content_list))
-        logger.info(f"Content list length: {len(content_list)}")
-
-        structured_data = []
-        for content in content_list:
-            data = await scrapper.get_final_structured_data_from_content_claude(
-                content.get("content"), location, postcode
-            )
-            print(f" structured data --> {data}")
-            logger.info(f" structured data --> {data}")
-            structured_data.append(data)
-            sleep(15)  # 15 sec
-
-        print("-------------> structured_data", structured_data)
-        logger.info(f" structured_data --> {structured_data}")
-        formatted_data = []
-        for json_str in structured_data:
-            formatted_data.extend(json.loads(json_str))
-
-        print("Formatted structured data:", formatted_data)
-        logger.info(f"Formatted structured data: {formatted_data}")
-        if len(formatted_data) == 0:
-            print("-------------> no data found")
-            logger.info("-------------> no data found")
-            return
-
-        contact_info_list = []
-        for data in formatted_data:
-            if data.get("website_link"):
-                print("-------------> inside website link")
-                content = await scrapper.crawl_dynamic_content(data["website_link"])
-                print("-------------> content", content)
-                logger.info(f"-------------> content: {content}")
-                page_internal_link = content.get("internal_links")
-                page_external_link = content.get("external_links")
-
-                # Extract contact-related links
-                contact_links = []
-
-                # Helper function to check links
-                def check_links_for_contact(links):
-                    if not links:
-                        return []
-
-                    found_links = []
-                    for link in links:
-                        href = link.get("href", "").lower()
-                        text = link.get("text", "").lower()
-
-                        # Check for contact-related keywords in URL or text
-                        contact_keywords = ["contact", "contact-us"]
-                        if any(keyword in href for keyword in contact_keywords) or any(
-                            keyword in text for keyword in contact_keywords
-                        ):
-                            found_links.append(link["href"])
-                    return found_links
-
-                # Check both internal and external links
-                contact_links.extend(check_links_for_contact(page_internal_link))
-                contact_links.extend(check_links_for_contact(page_external_link))
-
-                # Add check for empty contact_links
-                if contact_links:
-                    contact_content = await scrapper.crawl_dynamic_content(
-                        contact_links[0]
-                    )
-                    print("-------------> contact_content", contact_content)
-                    logger.info(f"-------------> contact_content: {contact_content}")
-                    contact_info = await scrapper.get_null_data_from_content_claude(
-                        contact_content.get("content"), data
-                    )
-                else:
-                    # Handle case when no contact links are found
-                    print("-------------> No contact links found")
-                    logger.info("-------------> No contact links found")
-                    contact_info = {}
-
-                print("-------------> contact_info", contact_info)
-                logger.info(f"-------------> contact_info: {contact_info}")
-                # Update data with contact information if available
-                for field in [
-                    "email",
-                    "phone_number",
-                    "website_link",
-                    "address",
-                    "postcode",
-                ]:
-                    if contact_info.get(field):
-                        data[field] = contact_info[field]
-
-                # Add the updated data to contact_info_list
-                contact_info_list.append(data)
-                print("-------------> updated data:", data)
-                logger.info(f"-------------> updated data: {data}")
-                print("-------------> contact_info_list", contact_info_list)
-                logger.info(f"-------------> contact_info_list: {contact_info_list}")
-                print("formatted_data", formatted_data)
-                logger.info(f"-------------> formatted_data: {formatted_data}")
-
-            elif data.get("internal_navigation_link"):
-                print("-------------> inside internal link navigation")
-                logger.info("-------------> inside internal link navigation")
-                contact_info = await scrapper.crawl_dynamic_content(
-                    data["internal_navigation_link"]
-                )
-                contact_content = await scrapper.get_null_data_from_content_claude(
-                    contact_info.get("content"), data
-                )
-                # Convert contact_content to dictionary if it's a list with one item
-                if isinstance(contact_content, list) and len(contact_content) > 0:
-                    contact_content = contact_content[0]
-
-                print("-------------> contact_content", contact_content)
-                logger.info(f"-------------> contact_content: {contact_content}")
-                # Now safely access the dictionary
-                if isinstance(contact_content, dict):
-                    if contact_content.get("email"):
-                        data["email"] = contact_content["email"]
-                    if contact_content.get("phone_number"):
-                        data["phone_number"] = contact_content["phone_number"]
-                    if contact_content.get("website_link"):
-                        data["website_link"] = contact_content["website_link"]
-                    if contact_content.get("address"):
-                        data["address"] = contact_content["address"]
-                    if contact_content.get("postcode"):
-                        data["postcode"] = contact_content["postcode"]
-
-                contact_info_list.append(data)
-                print("-------------> contact_content", contact_info_list)
-                print("formatted_data", formatted_data)
-                logger.info(f"-------------> contact_content: {contact_info_list}")
-                logger.info(f"-------------> formatted_data: {formatted_data}")
-            else:
-                data["phone_number"] = "INTERNAL LINK NOT FOUND"
-
-        print("-------------> contact_info_list", contact_info_list)
-        logger.info(f"-------------> contact_info_list: {contact_info_list}")
-
-        for data in formatted_data:
-            if data.get("website_link"):
-                print("-------------> without LLM", data["business_name"])
-                logger.info("-------------> without LLM", data["business_name"])
-                try:
-                    # Construct potential contact page URLs
-                    contact_urls = [
-                        f"{data['website_link'].rstrip('/')}/contact",
-                        f"{data['website_link'].rstrip('/')}/contact-us",
-                        f"{data['website_link'].rstrip('/')}/contact.html",
-                        f"{data['website_link'].rstrip('/')}/contact-us.html",
-                        data["website_link"],
-                    ]
-
-                    for url in contact_urls:
-                        contact_info = await scrapper.extract_contact_info(url)
-                        if contact_info["success"]:
-                            # Update data if new information is found
-                            if (
-                                contact_info["phone_number"]
-                                and not data["phone_number"]
-                            ):
-                                data["phone_number"] = contact_info["phone_number"]
-                            if contact_info["email"] and not data["email"]:
-                                data["email"] = contact_info["email"]
-
-                            # Break if we found both phone and email
-                            if data["phone_number"] and data["email"]:
-                                break
-
-                except Exception as e:
-                    print(
-                        f"Error extracting contact info for {data['business_name']}: {str(e)}"
-                    )
-                    logger.info(
-                        f"Error extracting contact info for {data['business_name']}: {str(e)}"
-                    )
-            elif data.get("internal_navigation_link"):
-                print("-------------> LLM", data["business_name"])
-                contact_info = await scrapper.crawl_dynamic_content(
-                    data["internal_navigation_link"]
-                )
-                contact_info_structured = (
-                    await scrapper.get_null_data_from_content_claude(contact_info, data)
-                )
-                print("LLM contact_info_structured", contact_info_structured)
-                data.update(contact_info_structured)
-                logger.info(f"LLM contact_info_structured: {contact_info_structured}")
-
-        # firebase firestore
-        firestore = db()
-
-        for data in formatted_data:
-            await firestore.add_data("prospects", data)
-        print("end result", formatted_data)
-        logger.info(f"end result: {formatted_data}")
-        ex_end = perf_counter()
-        execution_time = ex_end - ex_start
-        print(f"Execution time {ex_end - ex_start} seconds")
-        return {
-            "status": "success",
-            "execution_time": execution_time,
-            "data": formatted_data,
-        }
+        prospects = {}
+        async for event in run_pipeline(location, postcode):
+            if event["event"] == "prospect":
+                prospects[event["index"]] = event["data"]
+            elif event["event"] == "done":
+                if event["status"] == "no_data":
+                    return
+                return {
+                    "status": "success",
+                    "execution_time": event["execution_time"],
+                    "data": [prospects[i] for i in sorted(prospects)],
+                }
     except Exception as e:
-        logger.error(f"Error processing location: {str(e)}")
+        logger.error("Error processing location: %s", e)
         raise HTTPException(
             status_code=500, detail=f"Error processing location: {str(e)}"
         )
 
 
+@app.post("/process-location/stream")
+async def process_location_stream(request: LocationRequest, http_request: Request):
+    """Stream pipeline progress and prospects as they are ready.
+
+    Sends newline-delimited JSON by default, or server-sent events when the
+    client accepts text/event-stream. Disconnecting cancels the remaining work.
+    """
+    from pipeline import run_pipeline
+
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    def encode(event: dict) -> str:
+        body = json.dumps(event)
+        return f"event: {event['event']}\ndata: {body}\n\n" if sse else body + "\n"
+
+    async def events():
+        pipeline = run_pipeline(request.location, request.postcode)
+        try:
+            async for event in pipeline:
+                yield encode(event)
+        except Exception as e:
+            logger.error("Error processing location: %s", e)
+            yield encode({"event": "error", "detail": str(e)})
+        finally:
+            await pipeline.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+
+@app.post("/jobs")
+async def submit_job(request: LocationRequest):
+    """Queue a location scan and return its id for polling"""
+    job_id = await get_job_queue().submit(request.location, request.postcode)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.post("/jobs/bulk")
+async def submit_bulk_job(request: BulkLocationRequest):
+    """Queue one combined scan of many locations.
+
+    Queries are generated per location while search results, crawled pages
+    and extraction are shared; GET /jobs/{job_id} returns the prospects
+    grouped by postcode.
+    """
+    if not request.locations:
+        raise HTTPException(status_code=422, detail="At least one location is required")
+    job_id = await get_job_queue().submit_bulk(
+        [(item.location, item.postcode) for item in request.locations]
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await get_job_queue().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -292,4 +204,4 @@ if __name__ == "__main__":
     import uvicorn
 
     port = int(os.getenv("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    uvicorn.run(app, host="0.0.0.0", port=port)
@@ -0,0 +1,215 @@
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached lookup up to a slow browser render
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def _samples(self) -> List[str]:
+        values = self.values()
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {value}"
+            for key, value in values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in flight while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple, List[int]] = {}
+        self._sums: Dict[Tuple, float] = {}
+        # Raw observations, only kept when sample retention is on (benchmarks)
+        self._raw: Optional[Dict[Tuple, List[float]]] = None
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+            if self._raw is not None:
+                self._raw.setdefault(key, []).append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, whether or not it raises"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def observations(self) -> Dict[Tuple, List[float]]:
+        """Raw values per label set, recorded since `retain_observations()`"""
+        with self._lock:
+            return {key: list(values) for key, values in (self._raw or {}).items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+        lines = []
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), bucket_counts):
+                cumulative += count
+                le = _format_labels(self.labels, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def retain_observations():
+    """Keep every histogram observation so exact percentiles can be computed"""
+    for metric in _registry:
+        if isinstance(metric, Histogram) and metric._raw is None:
+            metric._raw = {}
+
+
+def histograms() -> List[Histogram]:
+    return [metric for metric in _registry if isinstance(metric, Histogram)]
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+SEARCH_LATENCY = Histogram(
+    "prospects_tavily_request_seconds", "Tavily search request latency"
+)
+CRAWL_LATENCY = Histogram(
+    "prospects_crawl_seconds",
+    "Page fetch latency by method (plain HTTP or browser)",
+    ["method"],
+)
+ANTHROPIC_LATENCY = Histogram(
+    "prospects_anthropic_request_seconds", "Anthropic messages request latency"
+)
+ANTHROPIC_TOKENS = Counter(
+    "prospects_anthropic_tokens_total",
+    "Anthropic tokens used, by direction (input or output)",
+    ["direction"],
+)
+FIRESTORE_WRITE_LATENCY = Histogram(
+    "prospects_firestore_commit_seconds", "Firestore batched write commit latency"
+)
+STAGE_LATENCY = Histogram(
+    "prospects_stage_item_seconds", "Time a pipeline stage spends per item", ["stage"]
+)
+PIPELINE_LATENCY = Histogram(
+    "prospects_pipeline_seconds", "End-to-end location scan duration", ["status"]
+)
+CACHE_REQUESTS = Counter(
+    "prospects_cache_requests_total",
+    "On-disk cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+)
+FAILURES = Counter(
+    "prospects_failures_total",
+    "Failures by stage and error type",
+    ["stage", "type"],
+)
+IN_FLIGHT = Gauge(
+    "prospects_in_flight", "Items currently being processed per stage", ["stage"]
+)
+STARTUP_SECONDS = Gauge(
+    "prospects_startup_seconds",
+    "Seconds from loading the app to each startup phase (import, ready, prewarm)",
+    ["phase"],
+)
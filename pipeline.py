@@ -0,0 +1,632 @@
+import json
+import asyncio
+from time import perf_counter, time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from firebase import get_db, prospect_key
+from config import get_settings
+from logger_config import get_logger
+from metrics import FAILURES, PIPELINE_LATENCY
+from anthropic_client import get_anthropic_client
+from crawler.tavily import search_urls, get_tavily_http_client
+from crawler.tavily import query_generation
+from scrapper.crawlai_scrapper import scrapper
+from scrapper.politeness import HostQueues, get_host_scheduler
+from postcodes import has_postcode_index, nearby_postcodes, postcode_distance
+from scrapper.content_filter import POSTCODE_PATTERN, chunk_markdown
+from scrapper.contact_probe import probe_contact_pages
+from scrapper.contact_extractor import extract_contacts
+from scrapper.batch_extraction import extract_chunks_batched
+from concurrent_processing import STAGE_DONE, drain, run_stage
+
+settings = get_settings()
+
+logger = get_logger("prospects")
+
+
+# Take the address and postcode from the user
+# Validate the address and postcode
+# Generate the queries
+# Fetch the exclusion list from the db and send to the tavily or think the other way for doing exclusion list
+# loop the queries and send each query to the tavily api
+# Get the relevant urls
+# Loop through the urls and crawl the dynamic content
+# Crawl scrape the content if the data is relevant and related ( may be apply some agentic behaviour)
+# Extract Based on postcode and location
+# Get the final structured data
+# Return the final structured data
+# store the final
+
+
+def check_links_for_contact(links):
+    if not links:
+        return []
+
+    found_links = []
+    for link in links:
+        href = link.get("href", "").lower()
+        text = link.get("text", "").lower()
+
+        # Check for contact-related keywords in URL or text
+        contact_keywords = ["contact", "contact-us"]
+        if any(keyword in href for keyword in contact_keywords) or any(
+            keyword in text for keyword in contact_keywords
+        ):
+            found_links.append(link["href"])
+    return found_links
+
+
+async def find_contact_fields(content, data: dict):
+    """Missing contact fields for `data` from a page.
+
+    The deterministic extractor runs first; Claude is only asked when it
+    finds neither a phone number nor an email.
+    """
+    contacts = extract_contacts(
+        content if isinstance(content, str) else "",
+        data.get("business_name"),
+        data.get("website_link"),
+    )
+    if contacts["phone_number"] or contacts["email"]:
+        return {
+            field: contacts[field]
+            for field in ("phone_number", "email")
+            if contacts[field] and not data.get(field)
+        }
+    return await scrapper.get_null_data_from_content_claude(content, data)
+
+
+async def enrich_from_links(data: dict):
+    """First enrichment pass: follow the site's contact link and ask Claude"""
+    if data.get("website_link"):
+        logger.debug("-------------> inside website link")
+        content = await scrapper.crawl_dynamic_content(data["website_link"])
+        logger.debug("-------------> content: %s", content)
+        page_internal_link = content.get("internal_links")
+        page_external_link = content.get("external_links")
+
+        # Check both internal and external links
+        contact_links = []
+        contact_links.extend(check_links_for_contact(page_internal_link))
+        contact_links.extend(check_links_for_contact(page_external_link))
+
+        # Add check for empty contact_links
+        if contact_links:
+            contact_content = await scrapper.crawl_dynamic_content(contact_links[0])
+            logger.debug("-------------> contact_content: %s", contact_content)
+            contact_info = await find_contact_fields(
+                contact_content.get("content"), data
+            )
+        else:
+            # Handle case when no contact links are found
+            logger.info("-------------> No contact links found")
+            contact_info = {}
+
+        logger.debug("-------------> contact_info: %s", contact_info)
+        # Update data with contact information if available
+        for field in [
+            "email",
+            "phone_number",
+            "website_link",
+            "address",
+            "postcode",
+        ]:
+            if contact_info.get(field):
+                data[field] = contact_info[field]
+
+        logger.debug("-------------> updated data: %s", data)
+
+    elif data.get("internal_navigation_link"):
+        logger.debug("-------------> inside internal link navigation")
+        contact_info = await scrapper.crawl_dynamic_content(
+            data["internal_navigation_link"]
+        )
+        contact_content = await find_contact_fields(contact_info.get("content"), data)
+        # Convert contact_content to dictionary if it's a list with one item
+        if isinstance(contact_content, list) and len(contact_content) > 0:
+            contact_content = contact_content[0]
+
+        logger.debug("-------------> contact_content: %s", contact_content)
+        # Now safely access the dictionary
+        if isinstance(contact_content, dict):
+            if contact_content.get("email"):
+                data["email"] = contact_content["email"]
+            if contact_content.get("phone_number"):
+                data["phone_number"] = contact_content["phone_number"]
+            if contact_content.get("website_link"):
+                data["website_link"] = contact_content["website_link"]
+            if contact_content.get("address"):
+                data["address"] = contact_content["address"]
+            if contact_content.get("postcode"):
+                data["postcode"] = contact_content["postcode"]
+    elif not data.get("phone_number"):
+        data["phone_number"] = "INTERNAL LINK NOT FOUND"
+
+
+async def enrich_without_llm(data: dict):
+    """Second enrichment pass: regex the usual contact pages for phone and email"""
+    if data.get("website_link"):
+        logger.debug("-------------> without LLM: %s", data["business_name"])
+        try:
+            # Construct potential contact page URLs
+            contact_urls = [
+                f"{data['website_link'].rstrip('/')}/contact",
+                f"{data['website_link'].rstrip('/')}/contact-us",
+                f"{data['website_link'].rstrip('/')}/contact.html",
+                f"{data['website_link'].rstrip('/')}/contact-us.html",
+                data["website_link"],
+            ]
+
+            # Probed concurrently; stops once both phone and email are known
+            contact_info = await probe_contact_pages(
+                contact_urls,
+                need_phone=not data.get("phone_number"),
+                need_email=not data.get("email"),
+            )
+            # Update data if new information is found
+            if contact_info["phone_number"] and not data.get("phone_number"):
+                data["phone_number"] = contact_info["phone_number"]
+            if contact_info["email"] and not data.get("email"):
+                data["email"] = contact_info["email"]
+
+        except Exception as e:
+            logger.warning(
+                "Error extracting contact info for %s: %s", data["business_name"], e
+            )
+    elif data.get("internal_navigation_link"):
+        logger.debug("-------------> LLM: %s", data["business_name"])
+        contact_info = await scrapper.crawl_dynamic_content(
+            data["internal_navigation_link"]
+        )
+        contact_info_structured = await find_contact_fields(
+            contact_info.get("content"), data
+        )
+        logger.debug("LLM contact_info_structured: %s", contact_info_structured)
+        if isinstance(contact_info_structured, dict):
+            data.update(contact_info_structured)
+
+
+async def enrich_prospect(data: dict) -> dict:
+    """Run both enrichment passes for one prospect; failures leave it as extracted"""
+    try:
+        await enrich_from_links(data)
+        await enrich_without_llm(data)
+    except Exception as e:
+        logger.error("Error enriching %s: %s", data.get("business_name"), e)
+    return data
+
+
+# A stored prospect with all of these filled needs no further enrichment
+COMPLETE_FIELDS = ("phone_number", "email", "address")
+
+
+def is_complete_and_fresh(stored: Optional[dict]) -> bool:
+    if not stored or not all(stored.get(field) for field in COMPLETE_FIELDS):
+        return False
+    max_age = settings.PROSPECT_REFRESH_DAYS * 24 * 60 * 60
+    return time() - (stored.get("updated_at") or 0) < max_age
+
+
+def fill_missing(data: dict, stored: Optional[dict]):
+    """Copy stored values into the fields `data` has no value for"""
+    for field, value in (stored or {}).items():
+        if value and not data.get(field):
+            data[field] = value
+
+
+def changed_fields(data: dict, stored: Optional[dict]) -> dict:
+    """Non-empty fields of `data` that differ from the stored document.
+
+    Empty values are never returned, so a re-scan that found less than last
+    time (a site that was down, say) cannot wipe stored contact details.
+    """
+    if not stored:
+        return dict(data)
+    return {
+        key: value
+        for key, value in data.items()
+        if value not in (None, "") and stored.get(key) != value
+    }
+
+
+def dedupe_prospects(formatted_data: List[dict]) -> Dict[str, dict]:
+    """Collapse records for the same business, keeping the first one found"""
+    prospects: Dict[str, dict] = {}
+    for data in formatted_data:
+        key = prospect_key(data)
+        if key not in prospects:
+            prospects[key] = data
+        else:
+            # Fill gaps from the duplicate without overriding what we have
+            for field, value in data.items():
+                if value and not prospects[key].get(field):
+                    prospects[key][field] = value
+    return prospects
+
+
+def parse_extraction(json_str) -> List[dict]:
+    """Business records from one extraction reply"""
+    # Failed extractions come back as [] or an {"error": ...} dict
+    if isinstance(json_str, str):
+        return json.loads(json_str)
+    return []
+
+
+async def extract_chunks(
+    chunks: List[str], location: str, postcode: str, client=None
+) -> List[dict]:
+    """Extract business records from page chunks with Claude"""
+    if settings.EXTRACTION_MODE == "single":
+        # Claude calls are paced by the shared Anthropic rate limiter
+        structured_data = [
+            await scrapper.get_final_structured_data_from_content_claude(
+                chunk, location, postcode, client
+            )
+            for chunk in chunks
+        ]
+    else:
+        structured_data = await extract_chunks_batched(
+            chunks,
+            location,
+            postcode,
+            use_batch_api=settings.EXTRACTION_MODE == "batch",
+            client=client,
+        )
+    logger.debug(" structured data --> %s", structured_data)
+    records = []
+    for json_str in structured_data:
+        records.extend(parse_extraction(json_str))
+    return records
+
+
+def assign_location(
+    data: dict, locations: List[Tuple[str, str]]
+) -> Optional[Tuple[str, str]]:
+    """The scanned (location, postcode) a record belongs to, by its postcode.
+
+    A single-location scan keeps every record, as run_pipeline always has.
+    Otherwise picks the closest scanned postcode within POSTCODE_RADIUS_KM,
+    using the postcode centroid index and falling back to the numerically
+    closest one within NEARBY_POSTCODE_RANGE for postcodes it does not know.
+    None when the record is near none of them. Without the index no record
+    with a postcode is dropped: it goes to the numerically closest location.
+    """
+    if len(locations) == 1:
+        return locations[0]
+    postcode = (data.get("postcode") or "").strip()
+    if not postcode:
+        codes = POSTCODE_PATTERN.findall(data.get("address") or "")
+        postcode = codes[-1] if codes else ""
+    if not postcode:
+        return None
+    for location in locations:
+        if location[1] == postcode:
+            return location
+
+    # Numeric closeness is too rough to drop records on by itself
+    numeric_range = (
+        settings.NEARBY_POSTCODE_RANGE if has_postcode_index() else float("inf")
+    )
+    candidates = []
+    for name, code in locations:
+        km = postcode_distance(code, postcode)
+        if km is not None:
+            if km <= settings.POSTCODE_RADIUS_KM:
+                candidates.append((km, (name, code)))
+        elif code.isdigit() and postcode.isdigit():
+            gap = abs(int(code) - int(postcode))
+            if gap <= numeric_range:
+                candidates.append((float(gap), (name, code)))
+    return min(candidates)[1] if candidates else None
+
+
+async def run_pipeline(
+    location: str, postcode: str, claude=None, tavily=None
+) -> AsyncIterator[dict]:
+    """Run a location scan, yielding progress events as each stage advances.
+
+    See `scan_locations` for the events and clients.
+    """
+    async for event in scan_locations([(location, postcode)], claude, tavily):
+        yield event
+
+
+async def scan_locations(
+    locations: List[Tuple[str, str]], claude=None, tavily=None
+) -> AsyncIterator[dict]:
+    """Scan one or more locations as a single job, yielding progress events.
+
+    Queries are generated per location, but search urls, crawled pages and
+    Claude extraction are shared: every page is crawled and extracted once,
+    against the whole postcode set, and each record is then assigned to the
+    location its postcode belongs to.
+
+    The scan is a chain of stages joined by bounded queues - search, crawl,
+    extract, lookup, enrich and save - each with its own workers, so a page
+    goes to Claude while others are still being crawled and a prospect is
+    enriched and saved while extraction continues.
+
+    Events are dicts with an "event" key: "queries", then "search", "crawl"
+    and "extracted" as each of those stages finishes, one "prospect" per
+    enriched record (with its "index" in extraction order) as soon as it is
+    ready (tagged with its "location" and "postcode"), "saved" and finally
+    "done". Closing the generator early cancels any work still in flight.
+
+    Claude calls go through `claude` (an AsyncAnthropic) and searches through
+    `tavily` (an httpx.AsyncClient), defaulting to the process-wide pooled
+    clients.
+    """
+    ex_start = perf_counter()
+    claude = claude or get_anthropic_client()
+    tavily = tavily or get_tavily_http_client()
+    if len(locations) == 1:
+        location, postcode = locations[0]
+        nearby = None
+    else:
+        location = ", ".join(name for name, _ in locations)
+        postcode = ", ".join(code for _, code in locations)
+        nearby = set().union(*(nearby_postcodes(code) for _, code in locations))
+    size = settings.PIPELINE_QUEUE_SIZE
+    url_queue: asyncio.Queue = asyncio.Queue(size)
+    chunk_queue: asyncio.Queue = asyncio.Queue(size)
+    record_queue: asyncio.Queue = asyncio.Queue(size)
+    enrich_queue: asyncio.Queue = asyncio.Queue(size)
+    write_queue: asyncio.Queue = asyncio.Queue(size)
+    events: asyncio.Queue = asyncio.Queue()
+
+    firestore = get_db()
+    urls: List[str] = []
+    pages: List[str] = []
+    unchanged: List[str] = []
+    extracted: List[dict] = []
+    prospects: Dict[str, dict] = {}
+    writes: List[dict] = []
+    skipped = 0
+    stages: List[asyncio.Task] = []
+
+    async def search(queries: List[str]):
+        async for query_urls in search_urls(
+            queries, settings.SEARCH_CONCURRENCY, tavily
+        ):
+            for url in query_urls:
+                if url and url not in urls:
+                    urls.append(url)
+                    await url_queue.put(url)
+        await url_queue.put(STAGE_DONE)
+        logger.info("Found %d urls", len(urls))
+        logger.debug("URL ======>>>>> %s", urls)
+        events.put_nowait({"event": "search", "count": len(urls), "urls": urls})
+
+    async def crawl(url: str) -> List[str]:
+        page = await scrapper.crawl_dynamic_content(url)
+        if page.get("error"):
+            FAILURES.inc(stage="crawl", type="no_content")
+            return []
+        pages.append(url)
+        if page.get("changed") is False:
+            # Same content as last crawl: its extractions come from the Claude cache
+            unchanged.append(url)
+        # Only the relevant parts of each page are sent, long pages as several chunks
+        return chunk_markdown(
+            page.get("content"),
+            [name for name, _ in locations],
+            [code for _, code in locations],
+            nearby=nearby,
+        )
+
+    async def extract(chunks) -> List[dict]:
+        records = await extract_chunks(
+            chunks if isinstance(chunks, list) else [chunks],
+            location,
+            postcode,
+            claude,
+        )
+        extracted.extend(records)
+        return records
+
+    async def lookup(records: List[dict]):
+        new = {}
+        for key, data in dedupe_prospects(records).items():
+            if key not in prospects:
+                new[key] = data
+                continue
+            # Already on its way; fill gaps without overriding what we have
+            for field, value in data.items():
+                if value and not prospects[key].get(field):
+                    prospects[key][field] = value
+        targets = {}
+        for key, data in list(new.items()):
+            target = assign_location(data, locations)
+            if target is None:
+                logger.info("Dropping %s: outside the scanned postcodes", data)
+                del new[key]
+            else:
+                targets[key] = target
+
+        # Re-scans reuse stored prospects instead of enriching them again
+        existing = await firestore.get_many("prospects", list(new))
+        outputs = []
+        for key, data in new.items():
+            outputs.append((len(prospects), key, data, existing.get(key), targets[key]))
+            prospects[key] = data
+        return outputs
+
+    async def enrich(item):
+        nonlocal skipped
+        index, key, data, stored, (target_location, target_postcode) = item
+        event = {
+            "event": "prospect",
+            "index": index,
+            "location": target_location,
+            "postcode": target_postcode,
+            "data": data,
+        }
+        # Known fields are kept, and not probed for again
+        fill_missing(data, stored)
+        if is_complete_and_fresh(stored):
+            skipped += 1
+            events.put_nowait(event)
+            return None
+
+        await enrich_prospect(data)
+        events.put_nowait(event)
+        changes = changed_fields(data, stored)
+        changes["updated_at"] = time()
+        return [(key, changes)]
+
+    async def save(items):
+        writes.extend(await firestore.upsert_many("prospects", dict(items)))
+
+    async def run_stages():
+        try:
+            # step 2 : Generate queries
+            query_lists = await asyncio.gather(
+                *(
+                    query_generation(location=name, postcode=code, client=claude)
+                    for name, code in locations
+                )
+            )
+            queries = list(dict.fromkeys(q for qs in query_lists for q in qs))
+            logger.info("Generated queries: %s", queries)
+            events.put_nowait(
+                {"event": "queries", "count": len(queries), "queries": queries}
+            )
+
+            # step 3 : Get relevant urls from tavily
+            # step 4 : Scrape, extract, enrich and store, all overlapping
+            single = settings.EXTRACTION_MODE == "single"
+
+            async def crawl_stage():
+                # Urls of a throttled host wait their turn instead of a worker
+                hosts = HostQueues(get_host_scheduler(), settings.CRAWL_CONCURRENCY)
+                ready: asyncio.Queue = asyncio.Queue()
+
+                async def crawl_next(url: str) -> List[str]:
+                    try:
+                        return await crawl(url)
+                    finally:
+                        hosts.done(url)
+
+                await asyncio.gather(
+                    hosts.dispatch(url_queue, ready),
+                    run_stage(
+                        "crawl",
+                        crawl_next,
+                        ready,
+                        chunk_queue,
+                        settings.CRAWL_CONCURRENCY,
+                    ),
+                )
+                logger.info("Content list length: %d", len(pages))
+                events.put_nowait(
+                    {
+                        "event": "crawl",
+                        "count": len(pages),
+                        "total": len(urls),
+                        "unchanged": len(unchanged),
+                    }
+                )
+
+            async def extract_stage():
+                inbox = chunk_queue
+                batch_size = None if single else settings.BATCH_MAX_PAGES
+                if settings.EXTRACTION_MODE == "batch":
+                    # A Message Batches job takes minutes to end, so the whole
+                    # scan goes in one job instead of one job per ready group
+                    inbox = asyncio.Queue()
+                    inbox.put_nowait(await drain(chunk_queue))
+                    inbox.put_nowait(STAGE_DONE)
+                    batch_size = None
+                await run_stage(
+                    "extract",
+                    extract,
+                    inbox,
+                    record_queue,
+                    settings.EXTRACT_CONCURRENCY,
+                    batch_size=batch_size,
+                )
+                logger.info("Extracted %d records", len(extracted))
+                logger.debug("Formatted structured data: %s", extracted)
+                events.put_nowait({"event": "extracted", "count": len(extracted)})
+
+            stages.extend(
+                asyncio.create_task(stage)
+                for stage in (
+                    search(queries),
+                    crawl_stage(),
+                    extract_stage(),
+                    run_stage(
+                        "lookup", lookup, record_queue, enrich_queue, batch_size=size
+                    ),
+                    run_stage(
+                        "enrich",
+                        enrich,
+                        enrich_queue,
+                        write_queue,
+                        settings.ENRICH_CONCURRENCY,
+                    ),
+                    run_stage(
+                        "save",
+                        save,
+                        write_queue,
+                        batch_size=settings.FIRESTORE_BATCH_SIZE,
+                    ),
+                )
+            )
+            await asyncio.gather(*stages)
+
+            if not extracted:
+                logger.info("-------------> no data found")
+                PIPELINE_LATENCY.observe(perf_counter() - ex_start, status="no_data")
+                events.put_nowait(
+                    {
+                        "event": "done",
+                        "status": "no_data",
+                        "execution_time": perf_counter() - ex_start,
+                    }
+                )
+                return
+
+            # firebase firestore
+            saved = sum(1 for write in writes if write["success"])
+            events.put_nowait(
+                {
+                    "event": "saved",
+                    "count": saved,
+                    "failed": len(writes) - saved,
+                    "skipped": skipped,
+                    "errors": [
+                        write["error"] for write in writes if not write["success"]
+                    ],
+                }
+            )
+
+            end_result = list(prospects.values())
+            logger.debug("end result: %s", end_result)
+            execution_time = perf_counter() - ex_start
+            logger.info("Execution time %s seconds", execution_time)
+            PIPELINE_LATENCY.observe(execution_time, status="success")
+            events.put_nowait(
+                {"event": "done", "status": "success", "execution_time": execution_time}
+            )
+        except Exception as e:
+            FAILURES.inc(stage="pipeline", type=type(e).__name__)
+            events.put_nowait(e)
+        finally:
+            # A failed stage would leave the ones after it waiting forever
+            for stage in stages:
+                stage.cancel()
+            events.put_nowait(STAGE_DONE)
+
+    runner = asyncio.create_task(run_stages())
+    try:
+        while True:
+            event = await events.get()
+            if event is STAGE_DONE:
+                break
+            if isinstance(event, Exception):
+                raise event
+            yield event
+    finally:
+        # The consumer went away (e.g. client disconnect); stop outstanding work
+        runner.cancel()
@@ -0,0 +1,184 @@
+"""Offline index of Australian postcode centroids.
+
+The data file is a small CSV (postcode,latitude,longitude) built from the
+GeoNames AU postal code dump (CC BY 4.0, https://download.geonames.org/export/zip/):
+
+    python postcodes.py build AU.txt data/au_postcodes.csv
+
+The file is not committed yet. Without it nearby lookups fall back to treating
+numerically close postcodes as nearby, for scoring only: nothing is dropped as
+too far away without real distances (see `has_postcode_index`).
+"""
+
+import os
+import sys
+import csv
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from config import get_settings
+from logger_config import get_logger
+
+settings = get_settings()
+logger = get_logger("prospects")
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LATITUDE = 111.2
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class PostcodeIndex:
+    """Postcode centroids in flat arrays sorted by latitude.
+
+    A radius query binary-searches the latitude band that can contain
+    matches and checks only those entries, so it stays in the microsecond
+    range for the ~3,000 Australian postcodes.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[int, float, float]]):
+        rows = sorted(rows, key=lambda row: row[1])
+        self._codes = array("H", (row[0] for row in rows))
+        self._lats = array("d", (row[1] for row in rows))
+        self._lons = array("d", (row[2] for row in rows))
+        self._positions: Dict[int, int] = {code: i for i, code in enumerate(self._codes)}
+
+    @classmethod
+    def load(cls, path: str) -> "PostcodeIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(
+                (int(row["postcode"]), float(row["latitude"]), float(row["longitude"]))
+                for row in csv.DictReader(f)
+            )
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _position(self, postcode: str) -> Optional[int]:
+        try:
+            return self._positions.get(int(postcode))
+        except (TypeError, ValueError):
+            return None
+
+    def centroid(self, postcode: str) -> Optional[Tuple[float, float]]:
+        i = self._position(postcode)
+        return None if i is None else (self._lats[i], self._lons[i])
+
+    def distance(self, a: str, b: str) -> Optional[float]:
+        """Kilometres between two postcode centroids, None if either is unknown"""
+        i, j = self._position(a), self._position(b)
+        if i is None or j is None:
+            return None
+        return haversine_km(self._lats[i], self._lons[i], self._lats[j], self._lons[j])
+
+    def within(self, postcode: str, radius_km: float) -> Optional[Set[str]]:
+        """Postcodes whose centroid is within `radius_km` of `postcode`'s"""
+        i = self._position(postcode)
+        if i is None:
+            return None
+        lat, lon = self._lats[i], self._lons[i]
+        band = radius_km / KM_PER_DEGREE_LATITUDE
+        lo = bisect_left(self._lats, lat - band)
+        hi = bisect_right(self._lats, lat + band)
+        return {
+            f"{self._codes[k]:04d}"
+            for k in range(lo, hi)
+            if haversine_km(lat, lon, self._lats[k], self._lons[k]) <= radius_km
+        }
+
+
+_index: Optional[PostcodeIndex] = None
+_index_loaded = False
+
+
+def get_postcode_index() -> Optional[PostcodeIndex]:
+    """The shipped index, loaded on first use; None if the data file is missing"""
+    global _index, _index_loaded
+    if not _index_loaded:
+        _index_loaded = True
+        if os.path.exists(settings.POSTCODE_DATA_PATH):
+            _index = PostcodeIndex.load(settings.POSTCODE_DATA_PATH)
+        else:
+            logger.warning(
+                "Postcode data %s not found, using numeric postcode ranges",
+                settings.POSTCODE_DATA_PATH,
+            )
+    return _index
+
+
+def has_postcode_index() -> bool:
+    """Whether real centroid distances are available to filter by"""
+    return get_postcode_index() is not None
+
+
+def _numeric_range(postcode: str, radius: int) -> Set[str]:
+    try:
+        value = int(postcode)
+    except (TypeError, ValueError):
+        return set()
+    return {f"{code:04d}" for code in range(max(0, value - radius), value + radius + 1)}
+
+
+@lru_cache(maxsize=4096)
+def _nearby(postcode: str, radius_km: float) -> frozenset:
+    index = get_postcode_index()
+    found = index.within(postcode, radius_km) if index is not None else None
+    if found is None:
+        found = _numeric_range(postcode, settings.NEARBY_POSTCODE_RANGE)
+    return frozenset(found)
+
+
+def nearby_postcodes(postcode: str, radius_km: Optional[float] = None) -> Set[str]:
+    """Postcodes within `radius_km` (default POSTCODE_RADIUS_KM) of `postcode`.
+
+    Postcodes missing from the index (or no index at all) fall back to the
+    numeric range NEARBY_POSTCODE_RANGE.
+    """
+    radius = settings.POSTCODE_RADIUS_KM if radius_km is None else radius_km
+    return set(_nearby(str(postcode).strip(), float(radius)))
+
+
+def postcode_distance(a: str, b: str) -> Optional[float]:
+    """Kilometres between two postcodes, None if either is not in the index"""
+    index = get_postcode_index()
+    return index.distance(a, b) if index is not None else None
+
+
+def build(geonames_path: str, output_path: str) -> int:
+    """Average the GeoNames places of each postcode into one centroid row"""
+    sums: Dict[int, list] = {}
+    with open(geonames_path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11 or not fields[1].isdigit():
+                continue
+            entry = sums.setdefault(int(fields[1]), [0.0, 0.0, 0])
+            entry[0] += float(fields[9])
+            entry[1] += float(fields[10])
+            entry[2] += 1
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["postcode", "latitude", "longitude"])
+        for code in sorted(sums):
+            lat, lon, count = sums[code]
+            writer.writerow([f"{code:04d}", round(lat / count, 4), round(lon / count, 4)])
+    return len(sums)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        sys.exit("usage: python postcodes.py build AU.txt data/au_postcodes.csv")
+    print(f"Wrote {build(sys.argv[2], sys.argv[3])} postcodes to {sys.argv[3]}")
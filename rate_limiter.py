@@ -0,0 +1,216 @@
+import asyncio
+from time import monotonic
+from typing import Optional
+
+from anthropic import APIConnectionError, APIStatusError, RateLimitError
+
+from config import get_settings
+from logger_config import get_logger
+from metrics import ANTHROPIC_LATENCY, ANTHROPIC_TOKENS, FAILURES
+
+settings = get_settings()
+
+logger = get_logger("prospects")
+
+
+class _Bucket:
+    """Token bucket that refills `capacity` units evenly over one minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single request larger than the whole bucket only waits for a full one
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge extra (negative) units after the fact"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Async limiter for requests, input tokens and output tokens per minute.
+
+    Callers `acquire` an estimate before each request and `record` the real
+    usage afterwards so unused output reservation is returned to the bucket.
+    Output is reserved at the running average of what replies actually use
+    (see `expected_output`), not at `max_tokens`. A waiter re-checks the
+    buckets whenever usage is recorded, so returned tokens are spent at once.
+    `pause` blocks everyone until a server supplied retry-after has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = settings.ANTHROPIC_RPM,
+        input_tokens_per_minute: int = settings.ANTHROPIC_INPUT_TPM,
+        output_tokens_per_minute: int = settings.ANTHROPIC_OUTPUT_TPM,
+    ):
+        self.requests = _Bucket(requests_per_minute)
+        self.input_tokens = _Bucket(input_tokens_per_minute)
+        self.output_tokens = _Bucket(output_tokens_per_minute)
+        self._blocked_until = 0.0
+        self._output_average = float(settings.ANTHROPIC_OUTPUT_ESTIMATE)
+        self._lock = asyncio.Lock()
+        self._changed: Optional[asyncio.Event] = None
+
+    def expected_output(self, max_tokens: int) -> int:
+        """Output tokens to reserve for a request allowed up to `max_tokens`"""
+        return max(1, min(max_tokens, round(self._output_average)))
+
+    def _wake(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def acquire(self, input_tokens: int, output_tokens: int):
+        # The lock makes waiters queue in order instead of racing for refills
+        async with self._lock:
+            while True:
+                now = monotonic()
+                wait = max(
+                    self._blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.input_tokens.wait_time(input_tokens, now),
+                    self.output_tokens.wait_time(output_tokens, now),
+                )
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.input_tokens.take(input_tokens)
+                    self.output_tokens.take(output_tokens)
+                    return
+                # Sleep until the buckets refill, or until usage is recorded
+                if self._changed is None:
+                    self._changed = asyncio.Event()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def record(
+        self,
+        estimated_input: int,
+        reserved_output: int,
+        input_tokens: int,
+        output_tokens: int,
+    ):
+        self.input_tokens.adjust(estimated_input - input_tokens)
+        self.output_tokens.adjust(reserved_output - output_tokens)
+        self._output_average += 0.2 * (output_tokens - self._output_average)
+        self._wake()
+
+    def refund(self, reserved_output: int):
+        """Give back the output reservation of a request that produced nothing"""
+        self.output_tokens.adjust(reserved_output)
+        self._wake()
+
+    def pause(self, seconds: float):
+        self._blocked_until = max(self._blocked_until, monotonic() + seconds)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return len(text or "") // 4 + 1
+
+
+def _backoff(attempt: int) -> float:
+    return min(60.0, 2.0**attempt)
+
+
+def _retry_after(error: APIStatusError, attempt: int) -> float:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return _backoff(attempt)
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors worth retrying besides 429: timeouts, conflicts, overload and 5xx"""
+    if isinstance(error, APIConnectionError):
+        return True
+    return isinstance(error, APIStatusError) and (
+        error.status_code in (408, 409) or error.status_code >= 500
+    )
+
+
+async def create_message(client, limiter: Optional["RateLimiter"] = None, **kwargs):
+    """Call `client.messages.create(**kwargs)` within the shared Anthropic quota.
+
+    Retries 429 responses after the server's retry-after, pausing every
+    caller, and transient failures (connection errors, timeouts, 408/409,
+    529 overloaded and other 5xx) after an exponential backoff, up to
+    ANTHROPIC_MAX_RETRIES times in all. The clients are built with the SDK's
+    own retries off, so this is the only retry loop.
+    """
+    limiter = limiter or get_anthropic_limiter()
+
+    prompt_text = str(kwargs.get("system", "")) + "".join(
+        str(message.get("content", "")) for message in kwargs.get("messages", [])
+    )
+    estimated_input = estimate_tokens(prompt_text)
+    reserved_output = limiter.expected_output(kwargs.get("max_tokens", 1024))
+
+    attempt = 0
+    while True:
+        await limiter.acquire(estimated_input, reserved_output)
+        try:
+            with ANTHROPIC_LATENCY.time():
+                response = await client.messages.create(**kwargs)
+        except RateLimitError as e:
+            FAILURES.inc(stage="anthropic", type=type(e).__name__)
+            # Nothing was generated, so hand the output reservation back
+            limiter.refund(reserved_output)
+            if attempt >= settings.ANTHROPIC_MAX_RETRIES:
+                raise
+            delay = _retry_after(e, attempt)
+            logger.warning("Anthropic rate limited, retrying in %s seconds", delay)
+            limiter.pause(delay)
+            attempt += 1
+            continue
+        except Exception as e:
+            FAILURES.inc(stage="anthropic", type=type(e).__name__)
+            limiter.refund(reserved_output)
+            if not is_transient(e) or attempt >= settings.ANTHROPIC_MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            logger.warning(
+                "Anthropic request failed (%s), retrying in %s seconds", e, delay
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            ANTHROPIC_TOKENS.inc(usage.input_tokens, direction="input")
+            ANTHROPIC_TOKENS.inc(usage.output_tokens, direction="output")
+            limiter.record(
+                estimated_input,
+                reserved_output,
+                usage.input_tokens,
+                usage.output_tokens,
+            )
+        return response
+
+
+_anthropic_limiter: Optional[RateLimiter] = None
+
+
+def get_anthropic_limiter() -> RateLimiter:
+    global _anthropic_limiter
+    if _anthropic_limiter is None:
+        _anthropic_limiter = RateLimiter()
+    return _anthropic_limiter
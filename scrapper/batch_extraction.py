@@ -0,0 +1,302 @@
+import json
+import uuid
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from config import get_settings
+from logger_config import get_logger
+from anthropic_client import get_anthropic_client
+from rate_limiter import create_message, estimate_tokens
+from concurrent_processing import bounded_gather
+from scrapper.crawlai_scrapper import (
+    scrapper,
+    get_llm_cache,
+    extraction_cache_key,
+    CLAUDE_MODEL,
+)
+
+settings = get_settings()
+logger = get_logger("prospects")
+
+BATCH_EXTRACTION_PROMPT = """
+        Each page below is HTML content extracted in markdown format and wrapped in <page id="N"> ... </page> tags.
+
+        As an expert website data extraction system, analyze EACH page separately and extract all business-related information. Focus on identifying and extracting:
+            1. The business address MUST contain the exact postcode: {postcode} or nearby postcode only
+            2. If these conditions are not met exactly for a page, return an empty array [] for that page
+
+        1. Business Names: Extract complete company/business names
+        2. Email Addresses: Extract the complete email address of the business
+        3. Address: Extract complete postal/location address Example: ( 87 Barcom Avenue, DARLINGHURST NSW 2010) , ( 123 Main Street, SYDNEY NSW 2000)
+        4. Phone Numbers: Extract the complete phone number of the business (international format if present) Example: (02) 9391 1234, (02) 9391 1234
+        5. Website Links: Extract Business website URL no slug  Example: https://www.example.com
+        6. Postcode: Extract the postcode based on the address
+        7. Internal Navigation Link: Extract the correct internal navigation link of the content within the website Example: https://www.example.com/about
+
+        Return ONLY a JSON object mapping every page id to an array of objects with these exact fields, with no additional text or formatting:
+        {{
+          "0": [
+            {{
+              "business_name": string,
+              "address": string,
+              "phone_number": string,
+              "email": string,
+              "website_link": string,
+              "postcode": string,
+              "internal_navigation_link": string
+            }}
+          ],
+          "1": []
+        }}
+
+        Pages to analyze:
+        {pages}
+
+           Remember: Use an empty array [] for a page if the postcode {postcode} and location {location} don't match exactly.
+           Return ONLY the JSON object, nothing else.
+        """
+
+SYSTEM_PROMPT = "You are a precise data extraction assistant. Always return valid JSON."
+
+
+def pack_chunks(
+    chunks: List[str],
+    batch_tokens: int = settings.BATCH_MAX_TOKENS,
+    batch_pages: int = settings.BATCH_MAX_PAGES,
+) -> List[List[int]]:
+    """Group chunk indexes so each group fits one request.
+
+    Chunks over half the token budget are sent on their own; the rest are
+    packed in order until the group reaches `batch_tokens` or `batch_pages`.
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for i, chunk in enumerate(chunks):
+        cost = estimate_tokens(chunk)
+        if cost > batch_tokens // 2:
+            groups.append([i])
+            continue
+        if current and (
+            current_tokens + cost > batch_tokens or len(current) >= batch_pages
+        ):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_request(chunks: List[str], location: str, postcode: str) -> dict:
+    """Message parameters for one packed request, pages numbered 0..n-1"""
+    pages = "\n\n".join(
+        f'<page id="{i}">\n{chunk}\n</page>' for i, chunk in enumerate(chunks)
+    )
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 4000,
+        "temperature": 0.7,
+        "system": SYSTEM_PROMPT,
+        "messages": [
+            {
+                "role": "user",
+                "content": BATCH_EXTRACTION_PROMPT.format(
+                    pages=pages, location=location, postcode=postcode
+                ),
+            }
+        ],
+    }
+
+
+def split_response(response_text: str, count: int) -> Optional[List[Optional[str]]]:
+    """Demultiplex a packed reply into one JSON array string per page.
+
+    Pages the reply leaves out (or answers with something other than an
+    array) come back as None, so they can be extracted on their own.
+    """
+    try:
+        clean_response = response_text.strip().strip("`").replace("json\n", "", 1)
+        parsed = json.loads(clean_response)
+    except json.JSONDecodeError as e:
+        logger.warning("Error parsing batched JSON response: %s", e)
+        return None
+    if not isinstance(parsed, dict):
+        return None
+
+    pages = []
+    for i in range(count):
+        records = parsed.get(str(i))
+        pages.append(json.dumps(records) if isinstance(records, list) else None)
+    return pages
+
+
+class LocalBatchBackend:
+    """Runs batch requests straight through the Messages API.
+
+    Stands in for the Message Batches API in development and tests; it keeps
+    the same submit/status/results shape as AnthropicBatchBackend.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._batches: Dict[str, Dict[str, dict]] = {}
+
+    async def submit(self, requests: List[dict]) -> str:
+        batch_id = f"local-{uuid.uuid4().hex}"
+        self._batches[batch_id] = {r["custom_id"]: r["params"] for r in requests}
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        return "ended"
+
+    async def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        requests = self._batches.pop(batch_id, {})
+
+        async def run(custom_id):
+            response = await create_message(self.client, **requests[custom_id])
+            return response.content[0].text
+
+        texts = await bounded_gather(
+            run,
+            list(requests),
+            settings.EXTRACT_CONCURRENCY,
+            on_error=lambda custom_id, e: None,
+        )
+        return dict(zip(requests, texts))
+
+
+class AnthropicBatchBackend:
+    """Submits requests through the Anthropic Message Batches API"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def submit(self, requests: List[dict]) -> str:
+        batch = await self.client.messages.batches.create(requests=requests)
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return batch.processing_status
+
+    async def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        texts: Dict[str, Optional[str]] = {}
+        async for item in await self.client.messages.batches.results(batch_id):
+            if item.result.type == "succeeded":
+                texts[item.custom_id] = item.result.message.content[0].text
+            else:
+                texts[item.custom_id] = None
+        return texts
+
+
+def get_batch_backend(client):
+    if settings.BATCH_BACKEND == "anthropic":
+        return AnthropicBatchBackend(client)
+    return LocalBatchBackend(client)
+
+
+async def run_batch_job(
+    backend, requests: List[dict], poll_interval: float = settings.BATCH_POLL_INTERVAL
+) -> Dict[str, Optional[str]]:
+    """Submit `requests`, wait for the batch to end and return text by custom_id"""
+    batch_id = await backend.submit(requests)
+    logger.debug("Submitted extraction batch %s with %d requests", batch_id, len(requests))
+    while await backend.status(batch_id) != "ended":
+        await asyncio.sleep(poll_interval)
+    return await backend.results(batch_id)
+
+
+async def extract_chunks_batched(
+    chunks: List[str],
+    location: str,
+    postcode: str,
+    use_batch_api: bool = False,
+    client=None,
+) -> List:
+    """Extract every chunk with as few Claude requests as possible.
+
+    Returns one entry per chunk in the same shape as
+    `get_final_structured_data_from_content_claude` (a JSON array string, or []
+    on failure). Cached chunks are answered without a request. Chunks whose
+    packed reply cannot be demultiplexed, or that it leaves out, fall back to
+    one request per chunk.
+    """
+    cache = get_llm_cache()
+    results: List = [None] * len(chunks)
+    keys = [extraction_cache_key(chunk, location, postcode) for chunk in chunks]
+
+    pending = []
+    for i, key in enumerate(keys):
+        cached = await cache.get(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    groups = [
+        [pending[j] for j in group]
+        for group in pack_chunks([chunks[i] for i in pending])
+    ]
+    requests: List[Tuple[str, List[int], dict]] = [
+        (
+            f"group-{n}",
+            group,
+            build_request([chunks[i] for i in group], location, postcode),
+        )
+        for n, group in enumerate(groups)
+    ]
+
+    if not requests:
+        return results
+
+    client = client or get_anthropic_client()
+    if use_batch_api:
+        texts = await run_batch_job(
+            get_batch_backend(client),
+            [
+                {"custom_id": custom_id, "params": params}
+                for custom_id, _, params in requests
+            ],
+        )
+    else:
+
+        async def run(request):
+            response = await create_message(client, **request[2])
+            return response.content[0].text
+
+        replies = await bounded_gather(
+            run, requests, settings.EXTRACT_CONCURRENCY, on_error=lambda r, e: None
+        )
+        texts = {custom_id: text for (custom_id, _, _), text in zip(requests, replies)}
+
+    retry = []
+    for custom_id, group, _ in requests:
+        text = texts.get(custom_id)
+        pages = split_response(text, len(group)) if text else None
+        if pages is None:
+            retry.extend(group)
+            continue
+        for i, page in zip(group, pages):
+            if page is None:
+                retry.append(i)
+                continue
+            results[i] = page
+            await cache.set(keys[i], page)
+
+    if retry:
+        logger.warning("Falling back to single-page extraction for %d chunks", len(retry))
+
+        async def extract_one(i):
+            return await scrapper.get_final_structured_data_from_content_claude(
+                chunks[i], location, postcode, client
+            )
+
+        fallback = await bounded_gather(
+            extract_one, retry, settings.EXTRACT_CONCURRENCY
+        )
+        for i, data in zip(retry, fallback):
+            results[i] = data
+
+    return results
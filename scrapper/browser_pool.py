@@ -0,0 +1,182 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List, Optional
+
+from config import get_settings
+from logger_config import get_logger
+from metrics import CRAWL_LATENCY, FAILURES
+from scrapper.politeness import get_host_scheduler
+
+if TYPE_CHECKING:
+    from crawl4ai import AsyncWebCrawler
+
+settings = get_settings()
+logger = get_logger("prospects")
+
+# Error fragments that mean the underlying browser is gone and must be replaced
+CRASH_MARKERS = (
+    "target closed",
+    "browser has been closed",
+    "browser closed",
+    "connection closed",
+    "context has been closed",
+    "page crashed",
+)
+
+
+def is_crash(error) -> bool:
+    """Return True if an exception or error message points to a dead browser"""
+    if not error:
+        return False
+    message = str(error).lower()
+    return any(marker in message for marker in CRASH_MARKERS)
+
+
+class _PooledBrowser:
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler: Optional["AsyncWebCrawler"] = None
+        self.active = 0
+        self.uses = 0
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    """A fixed set of warm AsyncWebCrawler instances shared by the whole process.
+
+    Each browser lends out up to `max_pages` concurrent pages. A browser that
+    crashes is closed at once and relaunched for the next caller; one that has
+    served `max_uses` pages is closed and relaunched the next time it is idle
+    so leaked pages and memory do not build up.
+    """
+
+    def __init__(
+        self,
+        size: int = settings.BROWSER_POOL_SIZE,
+        max_pages: int = settings.BROWSER_MAX_PAGES,
+        max_uses: int = settings.BROWSER_MAX_USES,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.max_uses = max(1, max_uses)
+        self._browsers: List[_PooledBrowser] = [
+            _PooledBrowser(i) for i in range(self.size)
+        ]
+        self._slots = asyncio.Semaphore(self.size * self.max_pages)
+        self._closed = False
+
+    async def start(self, warm: bool = True):
+        """Optionally launch every browser up front instead of on first use"""
+        self._closed = False
+        if warm:
+            await asyncio.gather(*(self._warm(b) for b in self._browsers))
+
+    async def _warm(self, browser: _PooledBrowser):
+        async with browser.lock:
+            if browser.crawler is None:
+                browser.crawler = await self._launch()
+
+    async def _launch(self) -> "AsyncWebCrawler":
+        # crawl4ai (and Playwright) is only imported once a browser is needed
+        from crawl4ai import AsyncWebCrawler
+
+        crawler = AsyncWebCrawler(verbose=False)
+        await crawler.start()
+        return crawler
+
+    async def _shutdown(self, browser: _PooledBrowser):
+        crawler, browser.crawler = browser.crawler, None
+        browser.uses = 0
+        if crawler is None:
+            return
+        try:
+            await crawler.close()
+        except Exception as e:
+            logger.warning("Error closing browser %d: %s", browser.index, e)
+
+    async def _checkout(self, browser: _PooledBrowser) -> "AsyncWebCrawler":
+        async with browser.lock:
+            # `active` already counts this caller's reservation
+            worn_out = browser.uses >= self.max_uses
+            if browser.crawler is not None and worn_out and browser.active == 1:
+                await self._shutdown(browser)
+            if browser.crawler is None:
+                browser.crawler = await self._launch()
+            browser.uses += 1
+            return browser.crawler
+
+    def _pick(self) -> _PooledBrowser:
+        # Prefer healthy browsers, then the least busy one
+        return min(
+            self._browsers,
+            key=lambda b: (b.uses >= self.max_uses, b.active),
+        )
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Lend out a started crawler; one page slot is held until release"""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+
+        async with self._slots:
+            browser = self._pick()
+            # Reserve before awaiting a launch, so callers arriving meanwhile
+            # pick the other browsers
+            browser.active += 1
+            try:
+                crawler = await self._checkout(browser)
+                try:
+                    yield crawler
+                except Exception as e:
+                    if is_crash(e):
+                        await self._discard(crawler)
+                    raise
+            finally:
+                browser.active -= 1
+
+    async def arun(self, url: str, **kwargs):
+        """Run `AsyncWebCrawler.arun` on a pooled browser within the host's slot"""
+        async with get_host_scheduler().slot(url), self.acquire() as crawler:
+            with CRAWL_LATENCY.time(method="browser"):
+                result = await crawler.arun(url=url, **kwargs)
+            if not result.success:
+                crashed = is_crash(result.error_message)
+                FAILURES.inc(stage="browser", type="crash" if crashed else "error")
+                if crashed:
+                    await self._discard(crawler)
+            return result
+
+    async def _discard(self, crawler: "AsyncWebCrawler"):
+        """Close a crashed crawler now so it is never lent out again"""
+        for browser in self._browsers:
+            if browser.crawler is crawler:
+                logger.warning("Browser %d crashed, relaunching it", browser.index)
+                await self._shutdown(browser)
+
+    async def close(self):
+        self._closed = True
+        await asyncio.gather(*(self._shutdown(b) for b in self._browsers))
+
+
+_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide pool, creating it lazily outside the app lifespan"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+async def start_browser_pool(warm: bool = True) -> BrowserPool:
+    pool = get_browser_pool()
+    await pool.start(warm=warm)
+    return pool
+
+
+async def close_browser_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -0,0 +1,180 @@
+import re
+from html import unescape
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+# Australian numbers: landlines (0X / +61 X), mobiles (04 / +61 4),
+# 1300/1800 and 13 xx xx. Separators may be spaces, dots, dashes or brackets.
+PHONE_RE = re.compile(
+    r"""
+    (?<![\d+])
+    (?:
+        (?:\+?61[\s.-]?|\(?0)[2378]\)?(?:[\s.-]?\d){8}      # landline
+      | (?:\+?61[\s.-]?|0)4\d{2}(?:[\s.-]?\d){6}            # mobile
+      | 1[38]00(?:[\s.-]?\d){6}                             # 1300 / 1800
+      | 13[\s.-]?\d{2}[\s.-]?\d{2}                          # 13 xx xx
+    )
+    (?!\d)
+    """,
+    re.VERBOSE,
+)
+TEL_LINK_RE = re.compile(r"tel:([+\d%\s().-]{6,})", re.IGNORECASE)
+
+EMAIL_RE = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+MAILTO_RE = re.compile(r"mailto:([^\s?\"')>\]]+)", re.IGNORECASE)
+# "info [at] example [dot] com", "info(at)example.com", "info AT example DOT com".
+# Only bracketed "at", or a bare upper-case " AT " together with " DOT ", so
+# prose like "is at Westfield. Call us" is not read as an address.
+_AT = r"\s*[\[({<]\s*(?i:at)\s*[\])}>]\s*|\s+AT\s+"
+_DOT = r"\s*[\[({<]\s*(?i:dot|\.)\s*[\])}>]\s*|\s+DOT\s+|\."
+OBFUSCATED_EMAIL_RE = re.compile(
+    rf"([a-zA-Z0-9._%+-]+)({_AT})([a-zA-Z0-9-]+(?:(?:{_DOT})[a-zA-Z0-9-]+)+)"
+)
+DOT_RE = re.compile(_DOT)
+# Top-level domains an obfuscated address must end in
+KNOWN_TLDS = ("au", "com", "net", "org", "edu", "gov", "nz", "uk", "io", "co", "biz", "info")
+
+EXCLUDED_EMAIL_PARTS = (
+    "example.com",
+    "domain.com",
+    "email.com",
+    "yourname",
+    "yourdomain",
+    "sentry",
+    "wixpress.com",
+    "godaddy.com",
+)
+EXCLUDED_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+
+# Contacts mentioned within this many characters of the business name rank first
+NEAR_NAME_WINDOW = 600
+
+
+def normalize_phone(raw: str) -> Optional[str]:
+    """Digits of an Australian number in national format, or None if invalid"""
+    digits = re.sub(r"\D", "", unquote(raw))
+    if digits.startswith("61") and len(digits) == 11:
+        digits = "0" + digits[2:]
+    if len(digits) == 10 and digits[:2] in ("02", "03", "04", "07", "08"):
+        return digits
+    if len(digits) == 10 and digits[:4] in ("1300", "1800"):
+        return digits
+    if len(digits) == 6 and digits.startswith("13"):
+        return digits
+    return None
+
+
+def normalize_email(raw: str) -> Optional[str]:
+    email = unquote(raw).strip().strip(".").lower()
+    if not EMAIL_RE.fullmatch(email):
+        return None
+    if any(part in email for part in EXCLUDED_EMAIL_PARTS):
+        return None
+    if email.endswith(EXCLUDED_EMAIL_SUFFIXES):
+        return None
+    return email
+
+
+def _name_positions(text: str, business_name: Optional[str]) -> List[int]:
+    if not business_name:
+        return []
+    name = re.escape(business_name.strip().lower())
+    return [m.start() for m in re.finditer(name, text.lower())] if name else []
+
+
+class _Candidates:
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.order: Dict[str, int] = {}
+
+    def add(self, value: str, score: float):
+        if value not in self.order:
+            self.order[value] = len(self.order)
+        self.scores[value] = self.scores.get(value, 0.0) + score
+
+    def ranked(self) -> List[str]:
+        return sorted(self.scores, key=lambda v: (-self.scores[v], self.order[v]))
+
+
+def _proximity(position: int, name_positions: List[int]) -> float:
+    if not name_positions:
+        return 0.0
+    distance = min(abs(position - p) for p in name_positions)
+    return max(0.0, 1.0 - distance / NEAR_NAME_WINDOW) * 2
+
+
+def _collect(
+    text: str,
+    phones: _Candidates,
+    emails: _Candidates,
+    business_name: Optional[str],
+    site_domain: str,
+):
+    text = unescape(text or "")
+    names = _name_positions(text, business_name)
+
+    for match in TEL_LINK_RE.finditer(text):
+        phone = normalize_phone(match.group(1))
+        if phone:
+            phones.add(phone, 2 + _proximity(match.start(), names))
+    for match in PHONE_RE.finditer(text):
+        phone = normalize_phone(match.group(0))
+        if phone:
+            phones.add(phone, 1 + _proximity(match.start(), names))
+
+    def add_email(raw: str, position: int, bonus: float):
+        email = normalize_email(raw)
+        if not email:
+            return
+        if site_domain and email.split("@")[-1].endswith(site_domain):
+            bonus += 2
+        emails.add(email, bonus + _proximity(position, names))
+
+    for match in MAILTO_RE.finditer(text):
+        add_email(match.group(1), match.start(), 2)
+    for match in EMAIL_RE.finditer(text):
+        add_email(match.group(0), match.start(), 1)
+    for match in OBFUSCATED_EMAIL_RE.finditer(text):
+        user, at, raw_domain = match.groups()
+        if at.strip() == "AT" and "DOT" not in raw_domain:
+            continue
+        domain = DOT_RE.sub(".", raw_domain)
+        if domain.rsplit(".", 1)[-1].lower() not in KNOWN_TLDS:
+            continue
+        add_email(f"{user}@{domain}", match.start(), 1)
+
+
+def _site_domain(website: Optional[str]) -> str:
+    netloc = urlparse(website or "").netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def extract_contacts(
+    pages: Iterable[str],
+    business_name: Optional[str] = None,
+    website: Optional[str] = None,
+) -> dict:
+    """Find the best phone number and email across one or more pages.
+
+    Candidates from every page are pooled and ranked: tel:/mailto: links and
+    emails on the business's own domain score higher, as do contacts close to
+    a mention of the business name; repeats add up.
+
+    Returns:
+        dict: {"phone_number", "email"} with the top candidates ("" if none),
+            plus "phones" and "emails" with every candidate in rank order
+    """
+    if isinstance(pages, str):
+        pages = [pages]
+    phones, emails = _Candidates(), _Candidates()
+    site_domain = _site_domain(website)
+    for text in pages:
+        _collect(text, phones, emails, business_name, site_domain)
+
+    ranked_phones, ranked_emails = phones.ranked(), emails.ranked()
+    return {
+        "phone_number": ranked_phones[0] if ranked_phones else "",
+        "email": ranked_emails[0] if ranked_emails else "",
+        "phones": ranked_phones,
+        "emails": ranked_emails,
+    }
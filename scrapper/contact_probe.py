@@ -0,0 +1,42 @@
+import asyncio
+from typing import List
+
+from scrapper.crawlai_scrapper import scrapper
+
+
+async def probe_contact_pages(
+    urls: List[str], need_phone: bool = True, need_email: bool = True
+) -> dict:
+    """Look for a phone number and email across candidate contact pages.
+
+    Every candidate is fetched concurrently as a probe: a plain request that
+    fails or answers 4xx/5xx is final, so only pages that exist are rendered.
+    Remaining probes are cancelled as soon as everything still needed has
+    been found.
+    """
+    found = {"phone_number": "", "email": ""}
+    if not (need_phone or need_email):
+        return found
+
+    tasks = [
+        asyncio.create_task(scrapper.extract_contact_info(url, probe=True))
+        for url in urls
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            contact_info = await task
+            if not contact_info["success"]:
+                continue
+            if contact_info["phone_number"] and not found["phone_number"]:
+                found["phone_number"] = contact_info["phone_number"]
+            if contact_info["email"] and not found["email"]:
+                found["email"] = contact_info["email"]
+
+            if (found["phone_number"] or not need_phone) and (
+                found["email"] or not need_email
+            ):
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+    return found
@@ -0,0 +1,177 @@
+import re
+from typing import Iterable, List, Optional
+
+from config import get_settings
+from postcodes import has_postcode_index, nearby_postcodes
+from rate_limiter import estimate_tokens
+
+settings = get_settings()
+
+POSTCODE_PATTERN = re.compile(r"\b(\d{4})\b")
+# A postcode written as part of an address, e.g. "Surry Hills NSW 2010"
+ADDRESS_POSTCODE_PATTERN = re.compile(
+    r"\b(?:NSW|VIC|QLD|SA|WA|TAS|NT|ACT)\.?,?\s+(\d{4})\b"
+)
+PHONE_PATTERN = re.compile(
+    r"(?:\+61|\(0[2378]\)|0[2378]|04\d{2}|1[38]00)[ -]?\d{2,4}[ -]?\d{3,4}"
+)
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+HEADING_PATTERN = re.compile(r"^\s*(#{1,6}\s+|\*\*[^*]+\*\*\s*$)", re.MULTILINE)
+MARKDOWN_LINK_PATTERN = re.compile(r"!?\[[^\]]*\]\([^)]*\)")
+
+BOILERPLATE_PHRASES = (
+    "all rights reserved",
+    "privacy policy",
+    "terms of use",
+    "terms and conditions",
+    "cookie",
+    "subscribe to our newsletter",
+    "sign up for our newsletter",
+    "skip to content",
+    "skip to main content",
+    "back to top",
+    "follow us",
+    "©",
+    "copyright",
+)
+
+BUSINESS_WORDS = (
+    "classes",
+    "lessons",
+    "centre",
+    "center",
+    "library",
+    "studio",
+    "school",
+    "academy",
+    "club",
+    "playgroup",
+    "pool",
+    "swim",
+    "dance",
+    "music",
+    "gym",
+)
+
+
+def split_blocks(markdown: str) -> List[str]:
+    """Split markdown into blocks at blank lines and headings"""
+    blocks = []
+    current: List[str] = []
+    for line in (markdown or "").splitlines():
+        is_heading = line.lstrip().startswith("#")
+        if not line.strip() or (is_heading and current):
+            if current:
+                blocks.append("\n".join(current).strip())
+            current = [line] if line.strip() else []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current).strip())
+    return [block for block in blocks if block]
+
+
+def is_boilerplate(block: str) -> bool:
+    """Navigation menus, footers and cookie banners"""
+    text = block.lower()
+    if any(phrase in text for phrase in BOILERPLATE_PHRASES) and len(text) < 400:
+        return True
+
+    # Blocks that are almost entirely links are menus
+    without_links = MARKDOWN_LINK_PATTERN.sub("", block)
+    remaining = re.sub(r"[\s*|\-•>]+", "", without_links)
+    return len(MARKDOWN_LINK_PATTERN.findall(block)) >= 3 and len(remaining) < 40
+
+
+def score_block(
+    block: str, locations: Iterable[str], postcodes: Iterable[str], nearby: Iterable[str]
+) -> int:
+    text = block.lower()
+    score = 0
+    postcodes = set(postcodes)
+
+    # A block whose addresses are all far away describes some other area.
+    # Without the centroid index "far" would only be a numeric guess.
+    addresses = set(ADDRESS_POSTCODE_PATTERN.findall(block))
+    if (
+        addresses
+        and has_postcode_index()
+        and not addresses & postcodes
+        and not addresses & set(nearby)
+    ):
+        return -1
+
+    codes = set(POSTCODE_PATTERN.findall(block))
+    if codes & postcodes:
+        score += 5
+    elif codes & set(nearby):
+        score += 3
+    if any(location and location.lower() in text for location in locations):
+        score += 2
+    if PHONE_PATTERN.search(block):
+        score += 2
+    if EMAIL_PATTERN.search(block) or "mailto:" in text:
+        score += 2
+    if HEADING_PATTERN.search(block) and any(word in text for word in BUSINESS_WORDS):
+        score += 1
+    return score
+
+
+def chunk_markdown(
+    markdown: str,
+    locations: List[str],
+    postcodes: List[str],
+    chunk_tokens: int = settings.EXTRACTION_CHUNK_TOKENS,
+    page_tokens: int = settings.EXTRACTION_PAGE_TOKENS,
+    nearby: Optional[Iterable[str]] = None,
+) -> List[str]:
+    """Reduce a page to the chunks worth sending to Claude.
+
+    Boilerplate is dropped, as are blocks whose addresses all lie outside
+    `nearby` (by default the postcodes near any of `postcodes`) when the
+    postcode centroid index is available, and the
+    remaining blocks are scored for any of the scanned postcodes or
+    `locations`, phone/email and business-heading signals. The best blocks, up to
+    `page_tokens` in total, are packed back in page order into chunks of at most
+    `chunk_tokens` each. A page with no relevant block yields no chunks.
+    """
+    if nearby is None:
+        nearby = set().union(*(nearby_postcodes(code) for code in postcodes))
+    nearby = set(nearby)
+
+    blocks = [block for block in split_blocks(markdown) if not is_boilerplate(block)]
+    scores = [score_block(block, locations, postcodes, nearby) for block in blocks]
+
+    # A heading directly above a relevant block usually carries the business name
+    keep = set()
+    for i, score in enumerate(scores):
+        if score >= 2:
+            keep.add(i)
+            if i > 0 and scores[i - 1] >= 0 and HEADING_PATTERN.search(blocks[i - 1]):
+                keep.add(i - 1)
+    if not keep:
+        return []
+
+    # Trim to the page budget, highest scoring blocks first
+    selected = set()
+    used = 0
+    for i in sorted(keep, key=lambda i: (-scores[i], i)):
+        cost = estimate_tokens(blocks[i])
+        if used + cost > page_tokens and selected:
+            continue
+        selected.add(i)
+        used += cost
+
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for i in sorted(selected):
+        cost = estimate_tokens(blocks[i])
+        if current and current_tokens + cost > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(blocks[i])
+        current_tokens += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
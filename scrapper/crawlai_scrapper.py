@@ -1,61 +1,163 @@
+import os
 import re
 import json
-from anthropic import AsyncAnthropic
-from crawl4ai import AsyncWebCrawler, CacheMode
+import hashlib
+from typing import Optional
+from crawl4ai import CacheMode
 
-from config import Settings
+from config import get_settings
+from anthropic_client import get_anthropic_client
+from logger_config import get_logger
+from rate_limiter import create_message
+from sqlite_cache import SQLiteCache
+from scrapper.browser_pool import get_browser_pool
+from scrapper.http_fetch import fetch_plain
+from scrapper.politeness import get_host_scheduler
+from scrapper.page_cache import CONTACT, PAGE, get_page_cache, validators_from
+from scrapper.contact_extractor import extract_contacts
 
-settings = Settings()
+settings = get_settings()
+
+logger = get_logger("prospects")
+
+CLAUDE_MODEL = "claude-3-haiku-20240307"  # claude-3-haiku-20240307 - haiku 3 , claude-3-5-haiku-20241022 - haiku 3.5
+
+# Bump these whenever the matching prompt changes so cached answers are not reused
+EXTRACTION_PROMPT_VERSION = "1"
+ENRICHMENT_PROMPT_VERSION = "1"
+
+CONTACT_EXCLUDED_TAGS = ["script", "style", "header", "nav", "footer"]
+
+_llm_cache: Optional[SQLiteCache] = None
+
+
+def get_llm_cache() -> SQLiteCache:
+    """On-disk cache of parsed Claude answers keyed by page content"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = SQLiteCache(
+            os.path.join(settings.CACHE_DIR, "claude.sqlite"),
+            max_bytes=settings.LLM_CACHE_MAX_BYTES,
+            compress=True,
+        )
+    return _llm_cache
+
+
+def normalize_markdown(content) -> str:
+    return re.sub(r"\s+", " ", str(content or "")).strip()
+
+
+def llm_cache_key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def extraction_cache_key(content: str, location: str, postcode: str) -> str:
+    return llm_cache_key(
+        "extract",
+        EXTRACTION_PROMPT_VERSION,
+        CLAUDE_MODEL,
+        normalize_markdown(content),
+        location.strip().lower(),
+        postcode.strip(),
+    )
 
 
 class scrapper:
+    @staticmethod
+    async def _load_page(
+        url: str, variant: str, accept, excluded_tags, render, probe: bool = False
+    ) -> dict:
+        """Serve a page from the page store, revalidating or refetching it as needed.
+
+        Fresh entries of an `accept`ed variant are returned as is. Stale ones
+        are revalidated with a conditional plain request, and only refetched
+        (plain first, then `render` in the browser) when they have changed.
+        A `probe` always tries the plain request, and only renders pages that
+        answered it successfully.
+        """
+        cache = get_page_cache() if settings.PAGE_CACHE_ENABLED else None
+        entry = await cache.get(url, accept) if cache is not None else None
+        if entry is not None and cache.is_fresh(entry):
+            return cache.page(entry)
+
+        page = None
+        if settings.PLAIN_FETCH_ENABLED or probe:
+            page = await fetch_plain(
+                url,
+                excluded_tags=excluded_tags,
+                validators=entry["validators"] if entry is not None else None,
+                errors_are_final=probe,
+            )
+            if page is not None and page.get("not_modified") and entry is not None:
+                return await cache.revalidated(url, entry)
+        if page is None or page.get("not_modified"):
+            page = await render(url)
+
+        validators = page.pop("validators", None)
+        if cache is None or page.get("error"):
+            return page
+        return await cache.put(url, page, variant, validators, previous=entry)
+
     @staticmethod
     async def crawl_dynamic_content(url: str):
-        async with AsyncWebCrawler(verbose=False) as crawler:
-            try:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
+        if not await get_host_scheduler().allowed(url):
+            return {"error": "Disallowed by robots.txt", "url": url}
 
-                result = await crawler.arun(
-                    url=url,
-                    # Content filtering
-                    word_count_threshold=10,
-                    excluded_tags=[],
-                    exclude_external_links=False,
-                    # Content processing
-                    process_iframes=False,
-                    remove_overlay_elements=False,
-                    extract_images=False,  # Disable image extraction
-                    # Cache control
-                    cache_mode=CacheMode.ENABLED,  # CacheMode.DISABLED,
-                    magic=True,
-                    wait_for_selector="body",
-                    page_timeout=20000,
-                    headers=headers,
-                )
-
-                if result.success and result.markdown:
-                    return {
-                        "url": result.url,
-                        "content": result.markdown,
-                        "internal_links": result.links.get("internal", []),
-                        "external_links": result.links.get("external", []),
-                    }
-                else:
-                    print(f"No content extracted from {url}")
-                    return {"error": "No content extracted", "url": url}
+        # Most pages are static; only render in a browser when they need it
+        return await scrapper._load_page(url, PAGE, (PAGE,), None, scrapper._render_page)
+
+    @staticmethod
+    async def _render_page(url: str) -> dict:
+        try:
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            }
+
+            result = await get_browser_pool().arun(
+                url=url,
+                # Content filtering
+                word_count_threshold=10,
+                excluded_tags=[],
+                exclude_external_links=False,
+                # Content processing
+                process_iframes=False,
+                remove_overlay_elements=False,
+                extract_images=False,  # Disable image extraction
+                # Cache control: pages are cached by the page store instead
+                cache_mode=CacheMode.BYPASS,
+                magic=True,
+                wait_for_selector="body",
+                page_timeout=20000,
+                headers=headers,
+            )
+
+            if result.success and result.markdown:
+                return {
+                    "url": result.url,
+                    "content": result.markdown,
+                    "internal_links": result.links.get("internal", []),
+                    "external_links": result.links.get("external", []),
+                    "validators": validators_from(result.response_headers),
+                }
+            else:
+                logger.debug("No content extracted from %s", url)
+                return {"error": "No content extracted", "url": url}
 
-            except Exception as e:
-                print(f"Error crawling {url}: {str(e)}")
-                return {"error": str(e), "url": url}
+        except Exception as e:
+            logger.warning("Error crawling %s: %s", url, e)
+            return {"error": str(e), "url": url}
 
     @staticmethod
     async def get_final_structured_data_from_content_claude(
-        content: str, location: str, postcode: str
+        content: str, location: str, postcode: str, client=None
     ):
-        # Initialize Anthropic client
-        client = AsyncAnthropic(api_key=settings.ANTHROPIC)
+        cache = get_llm_cache()
+        cache_key = extraction_cache_key(content, location, postcode)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = client or get_anthropic_client()
 
         # IMPORTANT: ONLY extract business data if ALL these conditions are met:
         prompt = """
@@ -95,8 +197,9 @@ class scrapper:
         """
 
         try:
-            response = await client.messages.create(
-                model="claude-3-haiku-20240307",  # claude-3-haiku-20240307 - haiku 3 , claude-3-5-haiku-20241022 - haiku 3.5
+            response = await create_message(
+                client,
+                model=CLAUDE_MODEL,
                 max_tokens=4000,
                 temperature=0.7,
                 system="You are a precise data extraction assistant. Always return valid JSON arrays.",
@@ -111,19 +214,39 @@ class scrapper:
             )
 
             # Extract JSON from Claude's response
-            print(response)
+            logger.debug("Claude response: %s", response)
             response_text = response.content[0].text
 
+            # Only remember answers that parse, so a bad reply is retried next time
+            try:
+                if isinstance(json.loads(response_text), list):
+                    await cache.set(cache_key, response_text)
+            except json.JSONDecodeError:
+                pass
+
             return response_text
 
         except Exception as e:
-            print(f"Error in data extraction: {str(e)}")
+            logger.warning("Error in data extraction: %s", e)
             return []
 
     @staticmethod
-    async def get_null_data_from_content_claude(content: str, data: dict) -> dict:
-        # Initialize Anthropic client
-        client = AsyncAnthropic(api_key=settings.ANTHROPIC)
+    async def get_null_data_from_content_claude(
+        content: str, data: dict, client=None
+    ) -> dict:
+        cache = get_llm_cache()
+        cache_key = llm_cache_key(
+            "enrich",
+            ENRICHMENT_PROMPT_VERSION,
+            CLAUDE_MODEL,
+            normalize_markdown(content),
+            data,
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        client = client or get_anthropic_client()
 
         prompt = """
         Analyze the following HTML content (in markdown format) and extract only missing information to fill null or empty fields in the provided business data. Only extract information that matches the exact business name and location.
@@ -154,8 +277,9 @@ class scrapper:
         }}
         """
 
-        response = await client.messages.create(
-            model="claude-3-haiku-20240307",  # claude-3-haiku-20240307 - haiku 3 , claude-3-5-haiku-20241022 - haiku 3.5
+        response = await create_message(
+            client,
+            model=CLAUDE_MODEL,
             max_tokens=4000,
             temperature=0.7,
             system="You are a precise data extraction assistant. Always return valid JSON arrays.",
@@ -172,90 +296,112 @@ class scrapper:
         try:
             # Remove any markdown code block syntax if present
             clean_response = response_text.strip("`").replace("json\n", "")
-            return json.loads(clean_response)
+            parsed = json.loads(clean_response)
+            await cache.set(cache_key, parsed)
+            return parsed
         except json.JSONDecodeError as e:
-            print(f"Error parsing JSON response: {e}")
+            logger.warning("Error parsing JSON response: %s", e)
             return {}
 
     @staticmethod
-    async def extract_contact_info(url: str) -> dict:
-        async with AsyncWebCrawler(verbose=False) as crawler:
-            try:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    async def _render_contact_page(url: str) -> dict:
+        try:
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            }
+
+            result = await get_browser_pool().arun(
+                url=url,
+                # Content filtering - focus on main content areas
+                word_count_threshold=5,  # Lower threshold for contact pages
+                excluded_tags=CONTACT_EXCLUDED_TAGS,
+                exclude_external_links=True,
+                # Content processing
+                process_iframes=False,
+                remove_overlay_elements=True,
+                extract_images=False,
+                # Cache control: pages are cached by the page store instead
+                cache_mode=CacheMode.BYPASS,
+                magic=True,
+                wait_for_selector="body",
+                timeout=30,  # Reduced timeout for contact pages
+                headers=headers,
+            )
+            if result.success and result.markdown:
+                return {
+                    "url": result.url,
+                    "content": result.markdown,
+                    "internal_links": result.links.get("internal", []),
+                    "external_links": [],
+                    "validators": validators_from(result.response_headers),
                 }
+            logger.debug("No content extracted from %s", url)
+            return {"error": "No content extracted", "url": url}
+        except Exception as e:
+            logger.warning("Error crawling %s: %s", url, e)
+            return {"error": str(e), "url": url}
 
-                result = await crawler.arun(
-                    url=url,
-                    # Content filtering - focus on main content areas
-                    word_count_threshold=5,  # Lower threshold for contact pages
-                    excluded_tags=["script", "style", "header", "nav", "footer"],
-                    exclude_external_links=True,
-                    # Content processing
-                    process_iframes=False,
-                    remove_overlay_elements=True,
-                    extract_images=False,
-                    # Cache control
-                    cache_mode=CacheMode.ENABLED,
-                    magic=True,
-                    wait_for_selector="body",
-                    timeout=30,  # Reduced timeout for contact pages
-                    headers=headers,
-                    respect_robots_txt=True,
-                )
-
-                if result.success and result.markdown:
-                    # Regular expressions for contact information
-                    phone_pattern = r"(?:(?:\+61|0)[23478])(?:[ -]?[0-9]){8}|(?:(?:\+61|0)[23478])(?:[ -]?[0-9]){8}|04[0-9]{2}(?:[ -]?[0-9]){6}"
-                    email_pattern = r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}"
-
-                    content_text = result.markdown
-
-                    # Extract phone numbers
-                    phone_matches = re.findall(phone_pattern, content_text)
-                    phone = (
-                        phone_matches[0].replace(" ", "").replace("-", "")
-                        if phone_matches
-                        else ""
-                    )
-
-                    # Extract emails
-                    email_matches = re.findall(email_pattern, content_text)
-                    email = ""
-                    if email_matches:
-                        valid_emails = [
-                            e
-                            for e in email_matches
-                            if not any(
-                                exclude in e.lower()
-                                for exclude in ["example.com", "domain.com"]
-                            )
-                        ]
-                        if valid_emails:
-                            email = valid_emails[0].lower()
-
-                    return {
-                        "success": True,
-                        "phone_number": phone,
-                        "email": email,
-                        "url": result.url,
-                    }
-                else:
-                    print(f"No content extracted from {url}")
-                    return {
-                        "success": False,
-                        "error": "No content extracted",
-                        "url": url,
-                        "phone_number": "",
-                        "email": "",
-                    }
+    @staticmethod
+    async def extract_contact_info(url: str, probe: bool = False) -> dict:
+        """Phone number and email of one page.
+
+        With `probe` the url is only a guess (e.g. /contact): a missing or
+        failing page is reported from the plain request, without a render.
+        """
+        try:
+            if not await get_host_scheduler().allowed(url):
+                return {
+                    "success": False,
+                    "error": "Disallowed by robots.txt",
+                    "url": url,
+                    "phone_number": "",
+                    "email": "",
+                }
+
+            # A cached full page of this url serves just as well
+            page = await scrapper._load_page(
+                url,
+                CONTACT,
+                (CONTACT, PAGE),
+                CONTACT_EXCLUDED_TAGS,
+                scrapper._render_contact_page,
+                probe=probe,
+            )
+            if page.get("error"):
+                return {
+                    "success": False,
+                    "error": page["error"],
+                    "url": url,
+                    "phone_number": "",
+                    "email": "",
+                }
+            content_text, page_url = page["content"], page["url"]
+
+            if content_text:
+                contacts = extract_contacts(content_text, website=url)
 
-            except Exception as e:
-                print(f"Error crawling {url}: {str(e)}")
+                return {
+                    "success": True,
+                    "phone_number": contacts["phone_number"],
+                    "email": contacts["email"],
+                    "url": page_url,
+                }
+            else:
+                logger.debug("No content extracted from %s", url)
                 return {
                     "success": False,
-                    "error": str(e),
+                    "error": "No content extracted",
                     "url": url,
                     "phone_number": "",
                     "email": "",
                 }
+
+        except Exception as e:
+            logger.warning("Error crawling %s: %s", url, e)
+            return {
+                "success": False,
+                "error": str(e),
+                "url": url,
+                "phone_number": "",
+                "email": "",
+            }
@@ -0,0 +1,138 @@
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from crawl4ai.html2text import HTML2Text
+
+from config import get_settings
+from logger_config import get_logger
+from metrics import CRAWL_LATENCY, FAILURES
+from http_client import get_http_client
+from scrapper.politeness import get_host_scheduler
+from scrapper.page_cache import conditional_headers, validators_from
+
+settings = get_settings()
+logger = get_logger("prospects")
+
+# Markup left behind by client-side rendered apps
+SPA_MARKERS = (
+    'id="root"></div>',
+    'id="app"></div>',
+    'id="__next"></div>',
+    "ng-app",
+    "data-reactroot",
+    "window.__nuxt__",
+    "enable javascript",
+    "requires javascript",
+)
+
+
+def base_domain(netloc: str) -> str:
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def looks_js_rendered(html: str, text: str) -> bool:
+    """Heuristic for pages that need a real browser to show their content"""
+    if len(text) < settings.PLAIN_FETCH_MIN_TEXT:
+        return True
+    lowered = html.lower()
+    return (
+        any(marker in lowered for marker in SPA_MARKERS)
+        and len(text) < settings.PLAIN_FETCH_MIN_TEXT * 4
+    )
+
+
+def split_links(soup: BeautifulSoup, page_url: str):
+    """Internal and external links in crawl4ai's {href, text, title, base_domain} shape"""
+    page_domain = base_domain(urlparse(page_url).netloc)
+    internal, external = [], []
+    seen = set()
+    for anchor in soup.find_all("a", href=True):
+        href = anchor["href"].strip()
+        if not href or href.startswith(("#", "javascript:")):
+            continue
+        href = urljoin(page_url, href)
+        if href in seen:
+            continue
+        seen.add(href)
+
+        domain = base_domain(urlparse(href).netloc)
+        link = {
+            "href": href,
+            "text": anchor.get_text(" ", strip=True),
+            "title": anchor.get("title", ""),
+            "base_domain": domain,
+        }
+        if href.startswith(("mailto:", "tel:")) or domain == page_domain:
+            internal.append(link)
+        else:
+            external.append(link)
+    return internal, external
+
+
+def html_to_markdown(html: str, url: str) -> str:
+    converter = HTML2Text(baseurl=url)
+    converter.body_width = 0
+    converter.ignore_images = True
+    return converter.handle(html)
+
+
+async def fetch_plain(
+    url: str,
+    excluded_tags: Optional[List[str]] = None,
+    validators: Optional[Dict[str, str]] = None,
+    errors_are_final: bool = False,
+) -> Optional[dict]:
+    """Fetch a page without a browser.
+
+    Returns the same {url, content, internal_links, external_links} shape as
+    `scrapper.crawl_dynamic_content` plus the response's "validators", an
+    {"error": ...} dict for pages that do not exist, {"not_modified": True}
+    when `validators` (from a cached copy) are still current, or None when
+    the page should be rendered in a browser instead (blocked, not HTML, or
+    apparently JavaScript rendered). With `errors_are_final`, a failed request
+    or any 4xx/5xx status is an {"error": ...} dict too, so probes of pages
+    that may not exist never fall back to the browser.
+    """
+    try:
+        async with get_host_scheduler().slot(url):
+            with CRAWL_LATENCY.time(method="plain"):
+                response = await get_http_client().get(
+                    url, headers=conditional_headers(validators)
+                )
+    except Exception as e:
+        logger.debug("Plain fetch failed for %s: %s", url, e)
+        FAILURES.inc(stage="plain_fetch", type=type(e).__name__)
+        return {"error": str(e), "url": url} if errors_are_final else None
+
+    if response.status_code == 304:
+        return {"not_modified": True, "url": url}
+    if response.status_code in (404, 410) or (
+        errors_are_final and response.status_code >= 400
+    ):
+        return {"error": f"HTTP {response.status_code}", "url": url}
+    if response.status_code >= 400:
+        return None
+    if "html" not in response.headers.get("content-type", "html"):
+        return None
+
+    html = response.text
+    soup = BeautifulSoup(html, "lxml")
+    final_url = str(response.url)
+    internal_links, external_links = split_links(soup, final_url)
+
+    for tag in soup(["script", "style", "noscript", *(excluded_tags or [])]):
+        tag.decompose()
+    text = re.sub(r"\s+", " ", soup.get_text(" ", strip=True))
+    if looks_js_rendered(html, text):
+        return None
+
+    return {
+        "url": final_url,
+        "content": html_to_markdown(str(soup), final_url),
+        "internal_links": internal_links,
+        "external_links": external_links,
+        "validators": validators_from(response.headers),
+    }
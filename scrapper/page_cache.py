@@ -0,0 +1,190 @@
+import os
+import hashlib
+from time import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from config import get_settings
+from sqlite_cache import SQLiteCache
+from scrapper.politeness import host_key
+
+settings = get_settings()
+
+# Query parameters that never change what a page shows
+TRACKING_PARAMS = ("utm_", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga")
+
+# Variants of a stored page: the full page, or the trimmed contact-page view
+PAGE = "page"
+CONTACT = "contact"
+
+
+def canonical_url(url: str) -> str:
+    """The cache identity of a url: no fragment, tracking params or default port"""
+    parts = urlparse((url or "").strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and (scheme, port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunparse((scheme, host, parts.path or "/", "", urlencode(query), ""))
+
+
+def cache_key(url: str, variant: str) -> str:
+    """Store key of one variant of a page: each variant is kept separately"""
+    return f"{variant} {canonical_url(url)}"
+
+
+def content_hash(content: str) -> str:
+    normalized = " ".join(str(content or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def validators_from(headers) -> Dict[str, str]:
+    """ETag/Last-Modified of a response, for a later conditional request"""
+    found = {}
+    for name in ("etag", "last-modified"):
+        value = headers.get(name) if headers else None
+        if value:
+            found[name] = value
+    return found
+
+
+def conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last-modified"):
+            headers["If-Modified-Since"] = validators["last-modified"]
+    return headers
+
+
+class PageCache:
+    """Crawled pages kept on disk, keyed by canonical url and variant.
+
+    Each entry holds the page's markdown and links (compressed), the
+    response's validators for conditional revalidation and a hash of the
+    content. Entries are fresh for PAGE_CACHE_TTL seconds, or the TTL of the
+    most specific matching domain in PAGE_CACHE_DOMAIN_TTLS; stale entries
+    are kept so they can be revalidated with a conditional request. The least
+    recently used entries are evicted beyond PAGE_CACHE_MAX_BYTES.
+
+    Pages handed out carry "content_hash" and "changed" (False when the
+    content is the same as the last time that variant of the url was
+    fetched). The crawl event reports the unchanged count; extraction is not
+    skipped, but unchanged chunks are answered by the content-keyed Claude
+    cache.
+    """
+
+    def __init__(
+        self,
+        store: SQLiteCache,
+        ttl: float = settings.PAGE_CACHE_TTL,
+        domain_ttls: Optional[Dict[str, float]] = None,
+    ):
+        self.store = store
+        self.ttl = ttl
+        self.domain_ttls = {
+            domain.lower().lstrip("."): value
+            for domain, value in (
+                settings.PAGE_CACHE_DOMAIN_TTLS if domain_ttls is None else domain_ttls
+            ).items()
+        }
+
+    def ttl_for(self, url: str) -> float:
+        """TTL of the longest configured domain that `url`'s host falls under"""
+        host = host_key(url).split(":")[0]
+        labels = host.split(".")
+        for i in range(len(labels)):
+            domain = ".".join(labels[i:])
+            if domain in self.domain_ttls:
+                return self.domain_ttls[domain]
+        return self.ttl
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time() - entry["fetched"] <= self.ttl_for(entry["url"])
+
+    async def get(self, url: str, variants: Iterable[str] = (PAGE,)) -> Optional[dict]:
+        """The stored entry for `url` of the first of `variants` that is fresh.
+
+        Falls back to the first stored one, stale, so it can be revalidated.
+        """
+        stale = None
+        for variant in variants:
+            entry = await self.store.get(cache_key(url, variant))
+            if entry is None:
+                continue
+            if self.is_fresh(entry):
+                return entry
+            stale = stale or entry
+        return stale
+
+    async def put(
+        self,
+        url: str,
+        page: dict,
+        variant: str = PAGE,
+        validators: Optional[Dict[str, str]] = None,
+        previous: Optional[dict] = None,
+    ) -> dict:
+        """Store a freshly fetched page and return it with its change flag.
+
+        `previous` is the entry returned by `get`; it is only compared with
+        when it is of the same variant.
+        """
+        if previous is None or previous["variant"] != variant:
+            previous = await self.store.get(cache_key(url, variant))
+        digest = content_hash(page["content"])
+        entry = {
+            "url": page.get("url") or url,
+            "variant": variant,
+            "content": page["content"],
+            "internal_links": page.get("internal_links", []),
+            "external_links": page.get("external_links", []),
+            "validators": validators or {},
+            "content_hash": digest,
+            "fetched": time(),
+        }
+        await self.store.set(cache_key(url, variant), entry)
+        changed = previous is None or previous["content_hash"] != digest
+        return self.page(entry, changed=changed)
+
+    async def revalidated(self, url: str, entry: dict) -> dict:
+        """Mark a stale entry fresh again after the server answered 304"""
+        entry = dict(entry, fetched=time())
+        await self.store.set(cache_key(url, entry["variant"]), entry)
+        return self.page(entry)
+
+    @staticmethod
+    def page(entry: dict, changed: bool = False) -> dict:
+        """An entry in the {url, content, internal_links, external_links} page shape"""
+        return {
+            "url": entry["url"],
+            "content": entry["content"],
+            "internal_links": entry["internal_links"],
+            "external_links": entry["external_links"],
+            "content_hash": entry["content_hash"],
+            "changed": changed,
+        }
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+    """The page store shared by every crawl in the process"""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache(
+            SQLiteCache(
+                os.path.join(settings.CACHE_DIR, "pages.sqlite"),
+                max_bytes=settings.PAGE_CACHE_MAX_BYTES,
+                compress=True,
+            )
+        )
+    return _page_cache
@@ -0,0 +1,240 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from config import get_settings
+from logger_config import get_logger
+from concurrent_processing import STAGE_DONE
+from http_client import USER_AGENT, get_http_client
+
+settings = get_settings()
+logger = get_logger("prospects")
+
+# Failed robots.txt lookups are retried sooner than successful ones
+ROBOTS_ERROR_TTL = 300
+
+
+def host_key(url: str) -> str:
+    netloc = urlparse(url or "").netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+class _Host:
+    def __init__(self, concurrency: int, interval: float):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.lock = asyncio.Lock()
+        self.interval = interval
+        self.next_start = 0.0
+
+
+class HostScheduler:
+    """Coordinates every request the crawler makes to the same host.
+
+    Each host gets its own concurrency limit and a minimum interval between
+    request starts (raised to the site's robots.txt Crawl-delay, up to
+    HOST_MAX_CRAWL_DELAY). Waiting happens per host, so a slow or throttled
+    host only holds back its own requests. robots.txt files are fetched once
+    per origin and kept in memory for `robots_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = settings.HOST_CONCURRENCY,
+        min_interval: float = settings.HOST_MIN_INTERVAL,
+        robots_ttl: int = settings.ROBOTS_CACHE_TTL,
+        robots_max_entries: int = settings.ROBOTS_CACHE_MAX_ENTRIES,
+    ):
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.robots_ttl = robots_ttl
+        self.robots_max_entries = robots_max_entries
+        self._hosts: Dict[str, _Host] = {}
+        self._robots: "OrderedDict[str, Tuple[float, Optional[RobotFileParser]]]" = (
+            OrderedDict()
+        )
+        self._robots_locks: Dict[str, asyncio.Lock] = {}
+
+    def _host(self, url: str) -> _Host:
+        key = host_key(url)
+        if key not in self._hosts:
+            self._hosts[key] = _Host(self.concurrency, self.min_interval)
+        return self._hosts[key]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold one of the host's request slots, spaced by its interval"""
+        host = self._host(url)
+        async with host.semaphore:
+            async with host.lock:
+                wait = host.next_start - monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                host.next_start = monotonic() + host.interval
+            yield
+
+    def delay(self, url: str) -> float:
+        """Seconds until the host's interval lets a request to `url` start"""
+        return max(0.0, self._host(url).next_start - monotonic())
+
+    async def allowed(self, url: str) -> bool:
+        """Whether robots.txt lets us fetch `url` (True when there is none)"""
+        if not settings.RESPECT_ROBOTS_TXT:
+            return True
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            return True
+        parser = await self._robots_for(f"{parsed.scheme}://{parsed.netloc}")
+        if parser is None:
+            return True
+        return parser.can_fetch(USER_AGENT, url)
+
+    async def _robots_for(self, origin: str) -> Optional[RobotFileParser]:
+        entry = self._robots.get(origin)
+        if entry is not None and entry[0] > monotonic():
+            self._robots.move_to_end(origin)
+            return entry[1]
+
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            # Another request may have fetched it while we waited
+            entry = self._robots.get(origin)
+            if entry is not None and entry[0] > monotonic():
+                return entry[1]
+            parser, ttl = await self._fetch_robots(origin)
+            self._store_robots(origin, parser, ttl)
+        self._robots_locks.pop(origin, None)
+        return parser
+
+    async def _fetch_robots(self, origin: str) -> Tuple[Optional[RobotFileParser], int]:
+        try:
+            response = await get_http_client().get(f"{origin}/robots.txt")
+        except Exception as e:
+            logger.warning("Error fetching robots.txt for %s: %s", origin, e)
+            return None, ROBOTS_ERROR_TTL
+        if response.status_code >= 500:
+            return None, ROBOTS_ERROR_TTL
+        if response.status_code >= 400:
+            # No robots.txt means no restrictions
+            return None, self.robots_ttl
+
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        parser.parse(response.text.splitlines())
+        delay = parser.crawl_delay(USER_AGENT)
+        if delay:
+            host = self._host(origin)
+            host.interval = max(
+                self.min_interval, min(float(delay), settings.HOST_MAX_CRAWL_DELAY)
+            )
+        return parser, self.robots_ttl
+
+    def _store_robots(self, origin: str, parser: Optional[RobotFileParser], ttl: int):
+        self._robots[origin] = (monotonic() + ttl, parser)
+        self._robots.move_to_end(origin)
+        while len(self._robots) > self.robots_max_entries:
+            self._robots.popitem(last=False)
+
+
+class HostQueues:
+    """Urls waiting to be crawled, one queue per host, handed out round-robin.
+
+    `dispatch` only passes a url on when a worker is free and its host has a
+    free slot and is past its interval; urls of a busy or throttled host wait
+    in that host's queue while other hosts' urls go ahead, so workers are not
+    parked in `HostScheduler.slot`. Call `done(url)` once a url handed out has
+    been crawled.
+    """
+
+    def __init__(self, scheduler: HostScheduler, workers: int):
+        self.scheduler = scheduler
+        self._workers = asyncio.Semaphore(max(1, workers))
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._active: Dict[str, int] = {}
+        self._changed = asyncio.Event()
+
+    def add(self, url: str):
+        self._queues.setdefault(host_key(url), deque()).append(url)
+
+    def done(self, url: str):
+        key = host_key(url)
+        self._active[key] -= 1
+        self._workers.release()
+        self._changed.set()
+
+    def _next(self) -> Tuple[Optional[str], Optional[float]]:
+        """The next url that may start now, or else how long until one may"""
+        soonest = None
+        for key, queue in self._queues.items():
+            if self._active.get(key, 0) >= self.scheduler.concurrency:
+                continue
+            wait = self.scheduler.delay(queue[0])
+            if wait > 0:
+                soonest = wait if soonest is None else min(soonest, wait)
+                continue
+            url = queue.popleft()
+            # The host goes to the back of the line
+            del self._queues[key]
+            if queue:
+                self._queues[key] = queue
+            self._active[key] = self._active.get(key, 0) + 1
+            return url, None
+        return None, soonest
+
+    async def dispatch(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        """Move urls from `inbox` to `outbox`, closing `outbox` once all are out"""
+        getter: Optional[asyncio.Task] = None
+        closed = False
+        try:
+            while True:
+                while not closed and getter is None and not inbox.empty():
+                    item = inbox.get_nowait()
+                    if item is STAGE_DONE:
+                        closed = True
+                    else:
+                        self.add(item)
+                if closed and not self._queues:
+                    break
+
+                await self._workers.acquire()
+                url, wait = self._next()
+                if url is not None:
+                    await outbox.put(url)
+                    continue
+                self._workers.release()
+
+                # Nothing can start yet: wait for a new url, a finished crawl
+                # or the end of the shortest host interval
+                if not closed and getter is None:
+                    getter = asyncio.create_task(inbox.get())
+                self._changed.clear()
+                changed = asyncio.create_task(self._changed.wait())
+                await asyncio.wait(
+                    [task for task in (getter, changed) if task is not None],
+                    timeout=wait,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                changed.cancel()
+                if getter is not None and getter.done():
+                    item = getter.result()
+                    getter = None
+                    if item is STAGE_DONE:
+                        closed = True
+                    else:
+                        self.add(item)
+        finally:
+            if getter is not None:
+                getter.cancel()
+        await outbox.put(STAGE_DONE)
+
+
+_scheduler: Optional[HostScheduler] = None
+
+
+def get_host_scheduler() -> HostScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = HostScheduler()
+    return _scheduler
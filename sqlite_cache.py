@@ -0,0 +1,140 @@
+import os
+import json
+import zlib
+import sqlite3
+import asyncio
+import threading
+from time import time
+from typing import Any, Optional
+
+from metrics import CACHE_REQUESTS
+
+
+class SQLiteCache:
+    """Small persistent key/value cache backed by one SQLite file.
+
+    Values are stored as JSON (optionally zlib compressed). Entries older than
+    `ttl` seconds are treated as missing, and the least recently used entries
+    are evicted once `max_entries` or `max_bytes` is exceeded. Blocking SQLite
+    calls run in a worker thread so the event loop never waits on disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        compress: bool = False,
+    ):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._conn.commit()
+
+    def _encode(self, value: Any) -> bytes:
+        data = json.dumps(value).encode("utf-8")
+        return zlib.compress(data) if self.compress else data
+
+    def _decode(self, data: bytes) -> Any:
+        if self.compress:
+            data = zlib.decompress(data)
+        return json.loads(data.decode("utf-8"))
+
+    def get_sync(self, key: str) -> Optional[Any]:
+        now = time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                CACHE_REQUESTS.inc(cache=self.name, result="miss")
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+        return self._decode(row[0])
+
+    def set_sync(self, key: str, value: Any):
+        data = self._encode(value)
+        now = time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete_sync(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self):
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        while (self.max_entries is not None and count > self.max_entries) or (
+            self.max_bytes is not None and total > self.max_bytes and count > 1
+        ):
+            key, size = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed ASC LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.evictions += 1
+            count -= 1
+            total -= size
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get_sync, key)
+
+    async def set(self, key: str, value: Any):
+        await asyncio.to_thread(self.set_sync, key, value)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.delete_sync, key)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
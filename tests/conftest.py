@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+# Settings require the API keys; tests never reach the real services
+os.environ.setdefault("ANTHROPIC", "test")
+os.environ.setdefault("TAVILY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import postcodes  # noqa: E402
+
+
+def _use_index(monkeypatch, index):
+    monkeypatch.setattr(postcodes, "_index", index)
+    monkeypatch.setattr(postcodes, "_index_loaded", True)
+    postcodes._nearby.cache_clear()
+
+
+@pytest.fixture
+def no_postcode_index(monkeypatch):
+    """Run as if data/au_postcodes.csv were missing"""
+    _use_index(monkeypatch, None)
+    yield
+    postcodes._nearby.cache_clear()
+
+
+@pytest.fixture
+def postcode_index(monkeypatch):
+    """A small centroid index (test points, not real centroids)"""
+    from postcodes import PostcodeIndex
+
+    _use_index(
+        monkeypatch,
+        PostcodeIndex(
+            [
+                (2000, -33.87, 151.21),
+                (2026, -33.89, 151.27),
+                (2031, -33.91, 151.24),
+                (2060, -33.84, 151.21),
+                (6000, -31.95, 115.86),
+            ]
+        ),
+    )
+    yield
+    postcodes._nearby.cache_clear()
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from scrapper import batch_extraction
+from scrapper.batch_extraction import extract_chunks_batched, split_response
+
+
+class FakeCache:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+
+def test_split_response_marks_missing_pages():
+    reply = json.dumps({"0": [{"business_name": "Swim Kids"}], "2": "nope"})
+    assert split_response(reply, 3) == [
+        json.dumps([{"business_name": "Swim Kids"}]),
+        None,
+        None,
+    ]
+    assert split_response("not json", 2) is None
+
+
+def test_missing_pages_fall_back_and_are_not_cached(monkeypatch):
+    cache = FakeCache()
+    fallback = []
+
+    async def create_message(client, **params):
+        text = json.dumps({"0": [{"business_name": "Swim Kids"}]})
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+    async def extract_one(chunk, location, postcode, client=None):
+        fallback.append(chunk)
+        return "[]"
+
+    monkeypatch.setattr(batch_extraction, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(batch_extraction, "create_message", create_message)
+    monkeypatch.setattr(
+        batch_extraction.scrapper,
+        "get_final_structured_data_from_content_claude",
+        extract_one,
+    )
+
+    results = asyncio.run(
+        extract_chunks_batched(["page a", "page b"], "Bondi", "2026", client=object())
+    )
+    assert results == [json.dumps([{"business_name": "Swim Kids"}]), "[]"]
+    assert fallback == ["page b"]
+    assert list(cache.values.values()) == [results[0]]
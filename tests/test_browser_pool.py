@@ -0,0 +1,137 @@
+import asyncio
+
+from scrapper.browser_pool import BrowserPool
+
+
+class FakeCrawler:
+    async def close(self):
+        pass
+
+
+class SlowLaunchPool(BrowserPool):
+    async def _launch(self):
+        await asyncio.sleep(0.01)
+        return FakeCrawler()
+
+
+def test_cold_pool_spreads_callers_across_browsers():
+    async def scenario():
+        pool = SlowLaunchPool(size=2, max_pages=4)
+        used = []
+        release = asyncio.Event()
+
+        async def borrow():
+            async with pool.acquire() as crawler:
+                used.append(crawler)
+                await release.wait()
+
+        tasks = [asyncio.create_task(borrow()) for _ in range(4)]
+        while len(used) < 4:
+            await asyncio.sleep(0.01)
+        active = [browser.active for browser in pool._browsers]
+        release.set()
+        await asyncio.gather(*tasks)
+        return used, active, [browser.active for browser in pool._browsers]
+
+    used, active, after = asyncio.run(scenario())
+    assert len(set(map(id, used))) == 2
+    assert active == [2, 2]
+    assert after == [0, 0]
+
+
+def test_failed_launch_releases_the_reservation():
+    class FailingPool(BrowserPool):
+        async def _launch(self):
+            raise RuntimeError("no chromium")
+
+    async def scenario():
+        pool = FailingPool(size=1)
+        try:
+            async with pool.acquire():
+                pass
+        except RuntimeError:
+            pass
+        return pool._browsers[0].active
+
+    assert asyncio.run(scenario()) == 0
+
+
+class ClosableCrawler(FakeCrawler):
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class CountingPool(BrowserPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.launched = []
+
+    async def _launch(self):
+        crawler = ClosableCrawler()
+        self.launched.append(crawler)
+        return crawler
+
+
+def test_crashed_browser_is_closed_while_other_pages_are_open():
+    async def scenario():
+        pool = CountingPool(size=1, max_pages=3)
+        release = asyncio.Event()
+        holding = asyncio.Event()
+
+        async def hold():
+            async with pool.acquire() as crawler:
+                holding.set()
+                await release.wait()
+                return crawler
+
+        holder = asyncio.create_task(hold())
+        await holding.wait()
+        try:
+            async with pool.acquire():
+                raise RuntimeError("Target closed")
+        except RuntimeError:
+            pass
+        # The other page is still open, yet the next caller gets a new browser
+        async with pool.acquire() as replacement:
+            pass
+        release.set()
+        crashed = await holder
+        return crashed, replacement, pool.launched
+
+    crashed, replacement, launched = asyncio.run(scenario())
+    assert crashed.closed
+    assert replacement is not crashed and not replacement.closed
+    assert launched == [crashed, replacement]
+
+
+def test_crash_reported_by_a_result_discards_the_browser(monkeypatch):
+    from scrapper import browser_pool
+    from scrapper.politeness import HostScheduler
+
+    class Result:
+        success = False
+        error_message = "Page.goto: Browser has been closed"
+
+    class CrashingCrawler(ClosableCrawler):
+        async def arun(self, url, **kwargs):
+            return Result()
+
+    class CrashingPool(CountingPool):
+        async def _launch(self):
+            crawler = CrashingCrawler()
+            self.launched.append(crawler)
+            return crawler
+
+    scheduler = HostScheduler(min_interval=0)
+    monkeypatch.setattr(browser_pool, "get_host_scheduler", lambda: scheduler)
+
+    async def scenario():
+        pool = CrashingPool(size=1)
+        await pool.arun("https://swim.test/")
+        await pool.arun("https://swim.test/contact")
+        return pool.launched
+
+    first, second = asyncio.run(scenario())
+    assert first.closed and second.closed
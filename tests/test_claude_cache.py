@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from scrapper import crawlai_scrapper
+from scrapper.crawlai_scrapper import extraction_cache_key, scrapper
+from sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def replies(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "claude.sqlite"), compress=True)
+    queued = []
+    calls = []
+
+    async def create_message(client, **params):
+        calls.append(params)
+        return SimpleNamespace(content=[SimpleNamespace(text=queued.pop(0))])
+
+    monkeypatch.setattr(crawlai_scrapper, "get_llm_cache", lambda: cache)
+    monkeypatch.setattr(crawlai_scrapper, "create_message", create_message)
+    return SimpleNamespace(queued=queued, calls=calls)
+
+
+def extract(content, location="Bondi", postcode="2026"):
+    return asyncio.run(
+        scrapper.get_final_structured_data_from_content_claude(
+            content, location, postcode, client=object()
+        )
+    )
+
+
+def test_same_content_is_extracted_once(replies):
+    replies.queued.append('[{"business_name": "Swim Kids"}]')
+    first = extract("Swim Kids\n\n12 Campbell Pde, Bondi NSW 2026")
+    # Whitespace and location case do not change the key
+    second = extract("Swim Kids 12 Campbell Pde,  Bondi NSW 2026", location=" bondi ")
+    assert first == second == '[{"business_name": "Swim Kids"}]'
+    assert len(replies.calls) == 1
+
+
+def test_unparseable_replies_are_not_cached(replies):
+    replies.queued.extend(["Sorry, no JSON", "[]"])
+    assert extract("Swim Kids") == "Sorry, no JSON"
+    assert extract("Swim Kids") == "[]"
+    assert len(replies.calls) == 2
+
+
+def test_key_depends_on_the_postcode():
+    assert extraction_cache_key("page", "Bondi", "2026") != extraction_cache_key(
+        "page", "Bondi", "2031"
+    )
@@ -0,0 +1,38 @@
+import asyncio
+
+from concurrent_processing import STAGE_DONE, drain, run_stage
+
+
+def test_drain_waits_for_the_queue_to_close():
+    async def scenario():
+        queue = asyncio.Queue(2)
+
+        async def produce():
+            for i in range(5):
+                await queue.put(i)
+            await queue.put(STAGE_DONE)
+
+        producer = asyncio.create_task(produce())
+        items = await drain(queue)
+        await producer
+        return items
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+
+
+def test_run_stage_passes_outputs_on_and_closes_outbox():
+    async def scenario():
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        for i in range(4):
+            inbox.put_nowait(i)
+        inbox.put_nowait(STAGE_DONE)
+
+        async def double(item):
+            if item == 3:
+                raise ValueError("bad item")
+            return [item * 2]
+
+        await run_stage("test", double, inbox, outbox, workers=2)
+        return await drain(outbox)
+
+    assert sorted(asyncio.run(scenario())) == [0, 2, 4]
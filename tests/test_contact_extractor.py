@@ -0,0 +1,28 @@
+from scrapper.contact_extractor import extract_contacts
+
+
+def emails(text):
+    return extract_contacts(text)["emails"]
+
+
+def test_prose_is_not_an_obfuscated_email():
+    assert emails("Our swim school is at Westfield. Call us") == []
+    assert emails("Classes run at St. Ives") == []
+
+
+def test_obfuscated_emails():
+    assert emails("Write to info [at] swimkids [dot] com [dot] au") == [
+        "info@swimkids.com.au"
+    ]
+    assert emails("bookings(at)dance.net.au") == ["bookings@dance.net.au"]
+    assert emails("hello AT music DOT com") == ["hello@music.com"]
+
+
+def test_obfuscated_email_needs_a_known_tld():
+    assert emails("hello [at] music [dot] classes") == []
+
+
+def test_plain_email_and_phone():
+    found = extract_contacts("Call (02) 9391 1234 or mail hi@swimkids.com.au")
+    assert found["phone_number"] == "0293911234"
+    assert found["email"] == "hi@swimkids.com.au"
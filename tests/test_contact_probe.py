@@ -0,0 +1,59 @@
+import asyncio
+
+from scrapper import contact_probe
+
+
+def test_probes_fetch_each_page_once_and_stop_when_done(monkeypatch):
+    fetched = []
+
+    async def extract_contact_info(url, probe=False):
+        assert probe
+        fetched.append(url)
+        if url.endswith("/missing"):
+            return {"success": False, "error": "HTTP 404", "phone_number": "", "email": ""}
+        if url.endswith("/contact"):
+            return {"success": True, "phone_number": "0293911234", "email": "hi@swim.com.au"}
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(contact_probe.scrapper, "extract_contact_info", extract_contact_info)
+    urls = ["https://swim.com.au/missing", "https://swim.com.au/contact", "https://swim.com.au/slow"]
+    found = asyncio.run(asyncio.wait_for(contact_probe.probe_contact_pages(urls), 2))
+    assert found == {"phone_number": "0293911234", "email": "hi@swim.com.au"}
+    assert sorted(fetched) == sorted(urls)
+
+
+def test_probe_never_renders_pages_the_plain_request_rejects(monkeypatch):
+    import httpx
+
+    from scrapper import crawlai_scrapper, http_fetch
+    from scrapper.politeness import HostScheduler
+
+    statuses = {"/missing": 404, "/blocked": 403, "/broken": 503}
+
+    def handler(request):
+        return httpx.Response(statuses[request.url.path], text="nope")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scheduler = HostScheduler(min_interval=0)
+    rendered = []
+
+    async def render(url):
+        rendered.append(url)
+        return {"error": "rendered", "url": url}
+
+    monkeypatch.setattr(http_fetch, "get_http_client", lambda: client)
+    monkeypatch.setattr(http_fetch, "get_host_scheduler", lambda: scheduler)
+    monkeypatch.setattr(crawlai_scrapper.settings, "PAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(crawlai_scrapper.settings, "PLAIN_FETCH_ENABLED", False)
+
+    async def scenario():
+        return [
+            await crawlai_scrapper.scrapper._load_page(
+                f"https://swim.test{path}", "contact", ("contact",), None, render, probe=True
+            )
+            for path in statuses
+        ]
+
+    pages = asyncio.run(scenario())
+    assert [page["error"] for page in pages] == ["HTTP 404", "HTTP 403", "HTTP 503"]
+    assert rendered == []
@@ -0,0 +1,33 @@
+from scrapper.content_filter import chunk_markdown, score_block
+
+PAGE = """# Randwick Swim School
+
+Learn to swim at 12 Avoca St, Randwick NSW 2031. Call (02) 9391 1234.
+
+# Perth Dance
+
+Classes at 1 Hay St, Perth WA 6000.
+"""
+
+
+def test_score_block_matches_any_scanned_location_and_postcode():
+    block = "Learn to swim at 12 Avoca St, Randwick NSW 2031."
+    assert score_block(block, ["Bondi", "Randwick"], ["2026", "2031"], set()) == 7
+
+
+def test_far_away_blocks_are_dropped_with_the_index(postcode_index):
+    block = "Classes at 1 Hay St, Perth WA 6000. Call (08) 9391 1234."
+    assert score_block(block, ["Sydney"], ["2000"], {"2000", "2060"}) == -1
+
+
+def test_nothing_is_dropped_as_far_away_without_the_index(no_postcode_index):
+    block = "Classes at 1 Hay St, Perth WA 6000. Call (08) 9391 1234."
+    assert score_block(block, ["Sydney"], ["2000"], {"2000"}) == 2
+    assert chunk_markdown(block, ["Sydney"], ["2000"]) == [block]
+
+
+def test_bulk_scan_keeps_blocks_for_every_location():
+    chunks = chunk_markdown(PAGE, ["Bondi", "Randwick"], ["2026", "2031"], nearby=set())
+    assert len(chunks) == 1
+    assert "Randwick Swim School" in chunks[0]
+    assert "Perth" not in chunks[0]
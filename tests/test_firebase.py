@@ -0,0 +1,147 @@
+import asyncio
+from itertools import count
+
+import pytest
+
+import firebase
+
+
+class FakeRef:
+    def __init__(self, doc_id):
+        self.id = doc_id
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.ids = count()
+
+    def document(self, doc_id=None):
+        return FakeRef(doc_id if doc_id is not None else f"auto-{next(self.ids)}")
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref.id, dict(data), merge))
+
+    def commit(self):
+        self.client.commits.append(len(self.writes))
+        if len(self.client.commits) in self.client.failing_commits:
+            raise RuntimeError("commit rejected")
+        for doc_id, data, merge in self.writes:
+            if merge and doc_id in self.client.documents:
+                self.client.documents[doc_id].update(data)
+            else:
+                self.client.documents[doc_id] = data
+
+
+class FakeFirestore:
+    """Just enough of the Firestore client for firebase.db"""
+
+    def __init__(self, failing_commits=()):
+        self.documents = {}
+        self.commits = []
+        self.failing_commits = set(failing_commits)
+        self._collection = FakeCollection()
+
+    def collection(self, name):
+        return self._collection
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, refs):
+        return [FakeSnapshot(ref.id, self.documents.get(ref.id)) for ref in refs]
+
+
+def connect(client):
+    store = firebase.db.__new__(firebase.db)
+    store._db__db = client
+    return store
+
+
+@pytest.fixture(autouse=True)
+def one_writer(monkeypatch):
+    # Commit batches one at a time so the failing one is predictable
+    monkeypatch.setattr(firebase.settings, "FIRESTORE_WRITE_CONCURRENCY", 1)
+
+
+def test_writes_are_split_into_batches_of_at_most_500(monkeypatch):
+    monkeypatch.setattr(firebase.settings, "FIRESTORE_BATCH_SIZE", 10_000)
+    client = FakeFirestore()
+    documents = {f"doc-{i}": {"n": i} for i in range(1201)}
+
+    results = asyncio.run(connect(client).upsert_many("prospects", documents))
+    assert client.commits == [500, 500, 201]
+    assert [r["id"] for r in results] == list(documents)
+    assert all(r["success"] for r in results)
+    assert len(client.documents) == 1201
+
+
+def test_a_failed_batch_fails_only_its_own_items(monkeypatch):
+    monkeypatch.setattr(firebase.settings, "FIRESTORE_BATCH_SIZE", 2)
+    client = FakeFirestore(failing_commits={2})
+    documents = {f"doc-{i}": {"n": i} for i in range(5)}
+
+    results = asyncio.run(connect(client).upsert_many("prospects", documents))
+    assert [r["success"] for r in results] == [True, True, False, False, True]
+    assert results[2] == {"id": None, "success": False, "error": "commit rejected"}
+    assert sorted(client.documents) == ["doc-0", "doc-1", "doc-4"]
+
+
+def test_upsert_merges_into_existing_documents():
+    client = FakeFirestore()
+    client.documents["swim"] = {"business_name": "Swim Kids", "email": "hi@swim.com.au"}
+
+    asyncio.run(connect(client).upsert_many("prospects", {"swim": {"phone_number": "0291234567"}}))
+    assert client.documents["swim"] == {
+        "business_name": "Swim Kids",
+        "email": "hi@swim.com.au",
+        "phone_number": "0291234567",
+    }
+
+
+def test_add_many_creates_new_documents():
+    client = FakeFirestore()
+    results = asyncio.run(connect(client).add_many("prospects", [{"n": 1}, {"n": 2}]))
+    assert [r["id"] for r in results] == ["auto-0", "auto-1"]
+    assert client.documents == {"auto-0": {"n": 1}, "auto-1": {"n": 2}}
+
+
+def test_get_many_returns_only_existing_documents():
+    client = FakeFirestore()
+    client.documents["swim"] = {"business_name": "Swim Kids"}
+    found = asyncio.run(connect(client).get_many("prospects", ["swim", "dance", "swim"]))
+    assert found == {"swim": {"business_name": "Swim Kids"}}
+
+
+def test_writes_without_a_connection_report_failure():
+    results = asyncio.run(connect(None).upsert_many("prospects", {"a": {}}))
+    assert results == [{"id": None, "success": False, "error": "Not connected"}]
+
+
+def test_prospect_key_ignores_fields_a_rescan_fills_in():
+    first = {"business_name": "Swim Kids!", "website_link": "https://www.swimkids.com.au/", "postcode": ""}
+    later = {"business_name": "swim kids", "website_link": "https://swimkids.com.au/about", "postcode": "2026"}
+    assert firebase.prospect_key(first) == firebase.prospect_key(later)
+
+
+def test_prospect_key_uses_the_phone_without_a_website():
+    first = {"business_name": "Rhyme Time", "phone_number": "(02) 9391 1234"}
+    later = {**first, "phone_number": "02 9391 1234", "postcode": "2000"}
+    other = {**first, "phone_number": "02 9391 9999"}
+    assert firebase.prospect_key(first) == firebase.prospect_key(later)
+    assert firebase.prospect_key(first) != firebase.prospect_key(other)
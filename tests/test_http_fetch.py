@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+import pytest
+
+from scrapper import http_fetch
+from scrapper.politeness import HostScheduler
+
+ARTICLE = "<p>" + "Toddler swimming lessons every weekday morning in Bondi. " * 10 + "</p>"
+PAGE = f"""<html><body>
+<nav><a href="/contact">Contact</a> <a href="https://facebook.com/swim">Facebook</a></nav>
+{ARTICLE}
+</body></html>"""
+
+
+def fetch(monkeypatch, handler, url="https://swim.test/", **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scheduler = HostScheduler(min_interval=0)
+    monkeypatch.setattr(http_fetch, "get_http_client", lambda: client)
+    monkeypatch.setattr(http_fetch, "get_host_scheduler", lambda: scheduler)
+    return asyncio.run(http_fetch.fetch_plain(url, **kwargs))
+
+
+def html(body, status=200, **headers):
+    return lambda request: httpx.Response(
+        status, text=body, headers={"content-type": "text/html; charset=utf-8", **headers}
+    )
+
+
+def test_html_pages_are_converted_without_a_browser(monkeypatch):
+    page = fetch(monkeypatch, html(PAGE, etag='"v1"'))
+    assert page["url"] == "https://swim.test/"
+    assert "Toddler swimming lessons" in page["content"]
+    assert [link["href"] for link in page["internal_links"]] == ["https://swim.test/contact"]
+    assert [link["href"] for link in page["external_links"]] == ["https://facebook.com/swim"]
+    assert page["validators"] == {"etag": '"v1"'}
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_missing_pages_are_errors(monkeypatch, status):
+    page = fetch(monkeypatch, html("gone", status))
+    assert page == {"error": f"HTTP {status}", "url": "https://swim.test/"}
+
+
+def test_unchanged_pages_are_not_modified(monkeypatch):
+    sent = []
+
+    def handler(request):
+        sent.append(request.headers.get("if-none-match"))
+        return httpx.Response(304)
+
+    page = fetch(monkeypatch, handler, validators={"etag": '"v1"'})
+    assert page == {"not_modified": True, "url": "https://swim.test/"}
+    assert sent == ['"v1"']
+
+
+@pytest.mark.parametrize("status", [403, 429, 500, 503])
+def test_other_failures_fall_back_to_the_browser(monkeypatch, status):
+    assert fetch(monkeypatch, html(PAGE, status)) is None
+
+
+def test_failures_are_final_for_probes(monkeypatch):
+    page = fetch(monkeypatch, html(PAGE, 403), errors_are_final=True)
+    assert page == {"error": "HTTP 403", "url": "https://swim.test/"}
+
+
+def test_request_errors_fall_back_to_the_browser(monkeypatch):
+    def handler(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    assert fetch(monkeypatch, handler) is None
+    assert fetch(monkeypatch, handler, errors_are_final=True) == {
+        "error": "refused",
+        "url": "https://swim.test/",
+    }
+
+
+def test_non_html_responses_are_left_to_the_browser(monkeypatch):
+    def handler(request):
+        return httpx.Response(200, content=b"%PDF-1.4", headers={"content-type": "application/pdf"})
+
+    assert fetch(monkeypatch, handler) is None
+
+
+def test_thin_pages_are_left_to_the_browser(monkeypatch):
+    assert fetch(monkeypatch, html("<html><body><p>Loading...</p></body></html>")) is None
+
+
+def test_javascript_shells_are_left_to_the_browser(monkeypatch):
+    shell = f'<html><body><div id="root"></div>{ARTICLE}<script>render()</script></body></html>'
+    assert fetch(monkeypatch, html(shell)) is None
+
+
+def test_looks_js_rendered():
+    text = "word " * 100
+    assert http_fetch.looks_js_rendered("<p>hi</p>", "hi")
+    assert not http_fetch.looks_js_rendered(f"<p>{text}</p>", text)
+    assert http_fetch.looks_js_rendered(f'<div id="app"></div><p>{text}</p>', text)
+    # A marker in a page with plenty of server-rendered text is not a shell
+    long_text = "word " * 400
+    assert not http_fetch.looks_js_rendered(f"<div ng-app><p>{long_text}</p></div>", long_text)
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+import jobs
+import pipeline
+from jobs import DONE, RUNNING, JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    yield store
+    store.close()
+
+
+def fake_scan(gate=None):
+    """A pipeline that yields a search event and two prospects"""
+
+    async def run_pipeline(location, postcode):
+        yield {"event": "search", "count": 2, "urls": []}
+        yield {"event": "prospect", "index": 0, "postcode": postcode, "data": {"business_name": "A"}}
+        if gate is not None:
+            await gate.wait()
+        yield {"event": "prospect", "index": 1, "postcode": postcode, "data": {"business_name": "B"}}
+        yield {"event": "done", "status": "success", "execution_time": 1.0}
+
+    return run_pipeline
+
+
+def test_interrupted_job_resumes_from_the_store(store, monkeypatch):
+    monkeypatch.setattr(pipeline, "run_pipeline", fake_scan())
+    job_id = store.create_sync("Bondi", "2026")
+    # A previous process got part of the way through
+    store.update_sync(job_id, status=RUNNING)
+    store.add_results_sync(job_id, [(None, {"business_name": "A"})])
+
+    async def scenario():
+        queue = JobQueue(store, workers=1)
+        await queue.start()
+        await queue._queue.join()
+        await queue.close()
+
+    asyncio.run(scenario())
+    job = store.get_sync(job_id)
+    assert job["status"] == DONE
+    assert job["results"] == [{"business_name": "A"}, {"business_name": "B"}]
+    assert job["stages"]["search"]["count"] == 2
+
+
+def test_job_endpoint_reports_progress(store, monkeypatch):
+    import main
+
+    monkeypatch.setattr(jobs, "_job_queue", JobQueue(store, workers=1))
+
+    async def scenario():
+        release = asyncio.Event()
+        monkeypatch.setattr(pipeline, "run_pipeline", fake_scan(release))
+        queue = jobs.get_job_queue()
+        await queue.start()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            job_id = (await client.post("/jobs", json={"location": "Bondi", "postcode": "2026"})).json()["job_id"]
+            while not store.get_sync(job_id)["results"]:
+                await asyncio.sleep(0.01)
+            during = (await client.get(f"/jobs/{job_id}")).json()
+            release.set()
+            await queue._queue.join()
+            after = (await client.get(f"/jobs/{job_id}")).json()
+            missing = await client.get("/jobs/nope")
+        await queue.close()
+        return during, after, missing.status_code
+
+    during, after, missing = asyncio.run(scenario())
+    assert during["status"] == RUNNING
+    assert during["results"] == [{"business_name": "A"}]
+    assert "search" in during["stages"]
+    assert after["status"] == DONE
+    assert len(after["results"]) == 2
+    assert missing == 404
+
+
+def test_bulk_results_are_grouped_by_postcode(store, monkeypatch):
+    async def scan_locations(locations):
+        yield {"event": "prospect", "index": 0, "postcode": "2031", "data": {"business_name": "A"}}
+        yield {"event": "done", "status": "success", "execution_time": 1.0}
+
+    monkeypatch.setattr(pipeline, "scan_locations", scan_locations)
+    job_id = store.create_sync("", "", [("Bondi", "2026"), ("Randwick", "2031")])
+
+    asyncio.run(JobQueue(store)._run(job_id))
+    assert store.get_sync(job_id)["results"] == {"2026": [], "2031": [{"business_name": "A"}]}
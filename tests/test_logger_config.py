@@ -0,0 +1,38 @@
+import json
+import logging
+from queue import SimpleQueue
+
+from logger_config import ContextFormatter, JsonFormatter, _ContextQueueHandler, log_context
+
+
+def log_exception(name):
+    queue = SimpleQueue()
+    handler = _ContextQueueHandler(queue)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger = logging.getLogger(name)
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        with log_context(job_id="job-1"):
+            try:
+                raise ValueError("bad page")
+            except ValueError:
+                logger.exception("Failed %s", "https://swim.test/")
+    finally:
+        logger.removeHandler(handler)
+    return queue.get_nowait()
+
+
+def test_json_records_keep_the_exception_separate():
+    entry = json.loads(JsonFormatter().format(log_exception("test.json")))
+    assert entry["message"] == "Failed https://swim.test/"
+    assert entry["job_id"] == "job-1"
+    assert entry["exception"].startswith("Traceback")
+    assert "ValueError: bad page" in entry["exception"]
+
+
+def test_text_records_still_show_the_traceback():
+    text = ContextFormatter("%(levelname)s %(message)s").format(log_exception("test.text"))
+    assert text.startswith("ERROR Failed https://swim.test/\nTraceback")
+    assert "ValueError: bad page" in text
+    assert text.endswith(" job_id=job-1")
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from scrapper import crawlai_scrapper
+from scrapper.page_cache import CONTACT, PAGE, PageCache, canonical_url
+from sqlite_cache import SQLiteCache
+
+URL = "https://swim.test/classes?utm_source=x#top"
+
+
+def page(content, external=("https://other.test/",)):
+    return {
+        "url": URL,
+        "content": content,
+        "internal_links": ["https://swim.test/contact"],
+        "external_links": list(external),
+    }
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = PageCache(SQLiteCache(str(tmp_path / "pages.sqlite"), compress=True), ttl=60)
+    monkeypatch.setattr(crawlai_scrapper, "get_page_cache", lambda: cache)
+    monkeypatch.setattr(crawlai_scrapper.settings, "PAGE_CACHE_ENABLED", True)
+    monkeypatch.setattr(crawlai_scrapper.settings, "PLAIN_FETCH_ENABLED", True)
+    yield cache
+    cache.store.close()
+
+
+def load(url, variant=PAGE, accept=(PAGE,), render=None):
+    async def never(url):
+        raise AssertionError("rendered")
+
+    return crawlai_scrapper.scrapper._load_page(url, variant, accept, None, render or never)
+
+
+def test_canonical_url_drops_tracking_and_fragment():
+    assert canonical_url(URL) == "https://swim.test/classes"
+
+
+def test_fresh_entry_is_served_without_a_request(cache, monkeypatch):
+    async def fetch_plain(*args, **kwargs):
+        raise AssertionError("fetched")
+
+    monkeypatch.setattr(crawlai_scrapper, "fetch_plain", fetch_plain)
+
+    async def scenario():
+        await cache.put(URL, page("Swim classes"), validators={"etag": '"1"'})
+        return await load("https://swim.test/classes")
+
+    served = asyncio.run(scenario())
+    assert served["content"] == "Swim classes"
+    assert served["changed"] is False
+
+
+def test_stale_entry_is_revalidated_with_its_validators(cache, monkeypatch):
+    sent = []
+
+    async def fetch_plain(url, excluded_tags=None, validators=None, errors_are_final=False):
+        sent.append(validators)
+        return {"not_modified": True, "url": url}
+
+    monkeypatch.setattr(crawlai_scrapper, "fetch_plain", fetch_plain)
+
+    async def scenario():
+        await cache.put(URL, page("Swim classes"), validators={"etag": '"1"'})
+        cache.ttl = 0
+        await asyncio.sleep(0.01)
+        served = await load(URL)
+        cache.ttl = 60
+        return served, await cache.get(URL)
+
+    served, entry = asyncio.run(scenario())
+    assert sent == [{"etag": '"1"'}]
+    assert served["content"] == "Swim classes"
+    assert cache.is_fresh(entry)
+
+
+def test_variants_are_stored_separately(cache):
+    async def scenario():
+        await cache.put(URL, page("Full page"), PAGE)
+        contact_reads_page = await cache.get(URL, (CONTACT, PAGE))
+        await cache.put(URL, page("Contact view", external=()), CONTACT)
+        return (
+            contact_reads_page,
+            await cache.get(URL, (CONTACT, PAGE)),
+            await cache.get(URL, (PAGE,)),
+        )
+
+    contact_reads_page, contact, full = asyncio.run(scenario())
+    assert contact_reads_page["variant"] == PAGE
+    assert contact["content"] == "Contact view"
+    assert full["content"] == "Full page"
+    assert full["external_links"] == ["https://other.test/"]
+
+
+def test_page_variant_is_not_served_for_a_contact_only_entry(cache):
+    async def scenario():
+        await cache.put(URL, page("Contact view"), CONTACT)
+        return await cache.get(URL, (PAGE,))
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_changed_compares_the_same_variant(cache):
+    async def scenario():
+        first = await cache.put(URL, page("Swim  classes"), PAGE)
+        same = await cache.put(URL, page("Swim classes\n"), PAGE)
+        contact = await cache.put(URL, page("Contact view"), CONTACT, previous=await cache.get(URL))
+        contact_again = await cache.put(URL, page("Contact view"), CONTACT, previous=await cache.get(URL))
+        edited = await cache.put(URL, page("Swim classes, now with dance"), PAGE)
+        return first, same, contact, contact_again, edited
+
+    first, same, contact, contact_again, edited = asyncio.run(scenario())
+    assert first["changed"] is True
+    assert same["changed"] is False
+    assert contact["changed"] is True
+    assert contact_again["changed"] is False
+    assert edited["changed"] is True
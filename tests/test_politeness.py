@@ -0,0 +1,38 @@
+import asyncio
+from time import monotonic
+
+from concurrent_processing import STAGE_DONE, run_stage
+from scrapper.politeness import HostQueues, HostScheduler
+
+
+def test_throttled_host_does_not_hold_up_others():
+    async def scenario():
+        scheduler = HostScheduler(concurrency=1, min_interval=0.05)
+        scheduler._host("https://slow.test/").interval = 0.5
+        hosts = HostQueues(scheduler, workers=2)
+        inbox, ready = asyncio.Queue(), asyncio.Queue()
+        for i in range(3):
+            inbox.put_nowait(f"https://slow.test/{i}")
+        for i in range(3):
+            inbox.put_nowait(f"https://fast.test/{i}")
+        inbox.put_nowait(STAGE_DONE)
+
+        started = {}
+        begin = monotonic()
+
+        async def crawl(url):
+            try:
+                async with scheduler.slot(url):
+                    started[url] = monotonic() - begin
+            finally:
+                hosts.done(url)
+
+        await asyncio.gather(
+            hosts.dispatch(inbox, ready), run_stage("crawl", crawl, ready, workers=2)
+        )
+        return started
+
+    started = asyncio.run(scenario())
+    assert len(started) == 6
+    assert max(started[f"https://fast.test/{i}"] for i in range(3)) < 0.3
+    assert started["https://slow.test/2"] >= 0.9
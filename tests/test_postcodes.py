@@ -0,0 +1,28 @@
+import postcodes
+from postcodes import PostcodeIndex
+
+# Test points only, not real centroids
+ROWS = [(2000, -33.87, 151.21), (2026, -33.89, 151.27), (2031, -33.91, 151.24), (3000, -37.81, 144.96)]
+
+
+def test_within_radius():
+    index = PostcodeIndex(ROWS)
+    assert index.within("2000", 10) == {"2000", "2026", "2031"}
+    assert index.within("3000", 10) == {"3000"}
+    assert index.within("9999", 10) is None
+
+
+def test_distance():
+    index = PostcodeIndex(ROWS)
+    assert 700 < index.distance("2000", "3000") < 720
+    assert index.distance("2000", "nope") is None
+
+
+def test_missing_data_falls_back_to_numeric_range(monkeypatch):
+    monkeypatch.setattr(postcodes, "_index", None)
+    monkeypatch.setattr(postcodes, "_index_loaded", True)
+    postcodes._nearby.cache_clear()
+    assert postcodes.nearby_postcodes("2000") == postcodes._numeric_range(
+        "2000", postcodes.settings.NEARBY_POSTCODE_RANGE
+    )
+    postcodes._nearby.cache_clear()
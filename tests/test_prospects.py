@@ -0,0 +1,36 @@
+from pipeline import assign_location, changed_fields, fill_missing
+
+
+def test_empty_rescan_values_do_not_overwrite_stored_ones():
+    stored = {"phone_number": "0291234567", "email": "", "address": "1 King St"}
+    data = {"phone_number": "", "email": "hi@example.com", "address": "1 King St"}
+    assert changed_fields(data, stored) == {"email": "hi@example.com"}
+
+
+def test_fill_missing_keeps_found_values():
+    data = {"phone_number": "", "email": "new@example.com"}
+    fill_missing(data, {"phone_number": "0291234567", "email": "old@example.com"})
+    assert data == {"phone_number": "0291234567", "email": "new@example.com"}
+
+
+def test_single_location_scan_keeps_every_record(no_postcode_index):
+    locations = [("Sydney", "2000")]
+    for data in (
+        {"postcode": "2060"},
+        {"postcode": "6000"},
+        {"address": "1 Hay St, Perth WA 6000"},
+        {},
+    ):
+        assert assign_location(data, locations) == ("Sydney", "2000")
+
+
+def test_bulk_scan_without_the_index_keeps_records_with_a_postcode(no_postcode_index):
+    locations = [("Sydney", "2000"), ("Bondi", "2026")]
+    assert assign_location({"postcode": "2010"}, locations) == ("Sydney", "2000")
+    assert assign_location({"postcode": "6000"}, locations) == ("Bondi", "2026")
+
+
+def test_bulk_scan_with_the_index_drops_far_records(postcode_index):
+    locations = [("Sydney", "2000"), ("Bondi", "2026")]
+    assert assign_location({"postcode": "2060"}, locations) == ("Sydney", "2000")
+    assert assign_location({"postcode": "6000"}, locations) is None
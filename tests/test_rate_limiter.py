@@ -0,0 +1,83 @@
+import asyncio
+from time import monotonic
+from types import SimpleNamespace
+
+import httpx
+from anthropic import APIStatusError
+
+from rate_limiter import RateLimiter, create_message
+
+
+class FakeClient:
+    """Stands in for AsyncAnthropic, replying with a fixed usage"""
+
+    def __init__(self, output_tokens=100, failures=()):
+        self.output_tokens = output_tokens
+        self.failures = list(failures)
+        self.calls = []
+        self.messages = self
+
+    async def create(self, **kwargs):
+        self.calls.append(monotonic())
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=10, output_tokens=self.output_tokens)
+        )
+
+
+def request():
+    return {
+        "model": "claude",
+        "max_tokens": 4000,
+        "messages": [{"role": "user", "content": "hello"}],
+    }
+
+
+def test_small_replies_are_not_paced_by_max_tokens():
+    async def main():
+        limiter = RateLimiter(50, 50000, 10000)
+        client = FakeClient(output_tokens=100)
+        start = monotonic()
+        await asyncio.gather(
+            *(create_message(client, limiter, **request()) for _ in range(6))
+        )
+        return [call - start for call in client.calls]
+
+    starts = asyncio.run(main())
+    assert len(starts) == 6
+    assert max(starts) < 1.0
+
+
+def test_recorded_usage_wakes_a_waiter():
+    async def main():
+        limiter = RateLimiter(1000, 100000, 1200)
+        await limiter.acquire(10, 1000)
+        # 200 tokens left at 20 per second: a second 1000 would wait 40 s
+        waiter = asyncio.create_task(limiter.acquire(10, 1000))
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+        start = monotonic()
+        limiter.record(10, 1000, 10, 100)
+        await asyncio.wait_for(waiter, 1.0)
+        return monotonic() - start
+
+    assert asyncio.run(main()) < 0.5
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr("rate_limiter._backoff", lambda attempt: 0.01)
+    overloaded = APIStatusError(
+        "overloaded",
+        response=httpx.Response(529, request=httpx.Request("POST", "http://claude")),
+        body=None,
+    )
+
+    async def main():
+        client = FakeClient(failures=[overloaded])
+        response = await create_message(client, RateLimiter(), **request())
+        return client, response
+
+    client, response = asyncio.run(main())
+    assert len(client.calls) == 2
+    assert response.usage.output_tokens == 100
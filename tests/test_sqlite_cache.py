@@ -0,0 +1,91 @@
+import asyncio
+import json
+import zlib
+from itertools import count
+
+import pytest
+
+import sqlite_cache
+from sqlite_cache import SQLiteCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake time that advances one second per call"""
+    ticks = count(1000)
+    now = {"value": 0.0}
+
+    def time():
+        now["value"] = float(next(ticks))
+        return now["value"]
+
+    monkeypatch.setattr(sqlite_cache, "time", time)
+    return now
+
+
+def make(tmp_path, **kwargs):
+    return SQLiteCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make(tmp_path, ttl=1.5)
+    cache.set_sync("a", {"v": 1})
+    assert cache.get_sync("a") == {"v": 1}  # one second later
+    assert cache.get_sync("a") is None  # two seconds after it was stored
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_least_recently_used_entry_is_evicted_by_count(tmp_path, clock):
+    cache = make(tmp_path, max_entries=2)
+    cache.set_sync("a", 1)
+    cache.set_sync("b", 2)
+    cache.get_sync("a")
+    cache.set_sync("c", 3)
+    assert cache.get_sync("b") is None
+    assert cache.get_sync("a") == 1
+    assert cache.get_sync("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_are_evicted_by_size(tmp_path, clock):
+    value = "x" * 100
+    cache = make(tmp_path, max_bytes=250)
+    for key in "abc":
+        cache.set_sync(key, value)
+    assert cache.get_sync("a") is None
+    assert cache.get_sync("b") == value
+    assert cache.get_sync("c") == value
+
+
+def test_an_entry_larger_than_max_bytes_is_still_kept(tmp_path):
+    cache = make(tmp_path, max_bytes=10)
+    cache.set_sync("big", "x" * 100)
+    assert cache.get_sync("big") == "x" * 100
+
+
+def test_compressed_round_trip(tmp_path):
+    value = {"content": "swim classes " * 200, "links": ["https://swim.test/"]}
+    cache = make(tmp_path, compress=True)
+    cache.set_sync("page", value)
+    raw, size = cache._conn.execute(
+        "SELECT value, size FROM entries WHERE key = 'page'"
+    ).fetchone()
+    assert json.loads(zlib.decompress(raw)) == value
+    assert size < len(json.dumps(value))
+    assert cache.get_sync("page") == value
+
+
+def test_concurrent_gets_and_sets(tmp_path):
+    cache = make(tmp_path, compress=True)
+
+    async def scenario():
+        await asyncio.gather(*(cache.set(f"k{i}", {"i": i}) for i in range(50)))
+        return await asyncio.gather(*(cache.get(f"k{i}") for i in range(50)))
+
+    assert asyncio.run(scenario()) == [{"i": i} for i in range(50)]
+    assert cache.hits == 50
+
+
+def test_entries_survive_reopening(tmp_path):
+    make(tmp_path).set_sync("a", [1, 2])
+    assert make(tmp_path).get_sync("a") == [1, 2]
@@ -0,0 +1,45 @@
+import asyncio
+
+import httpx
+
+from crawler import tavily
+from sqlite_cache import SQLiteCache
+
+
+def test_cached_searches_skip_tavily(tmp_path, monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"results": [{"url": "https://swim.test/"}]})
+
+    cache = SQLiteCache(str(tmp_path / "tavily.sqlite"))
+    monkeypatch.setattr(tavily, "get_search_cache", lambda: cache)
+
+    async def scenario():
+        async with httpx.AsyncClient(
+            base_url="https://tavily.test", transport=httpx.MockTransport(handler)
+        ) as client:
+            first = [urls async for urls in tavily.search_urls(["Swim  Bondi"], 2, client)]
+            # Same query after normalization: answered from the cache
+            second = [urls async for urls in tavily.search_urls(["swim bondi"], 2, client)]
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [["https://swim.test/"]]
+    assert len(calls) == 1
+
+
+def test_failed_searches_are_not_cached(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / "tavily.sqlite"))
+    monkeypatch.setattr(tavily, "get_search_cache", lambda: cache)
+
+    async def scenario():
+        async with httpx.AsyncClient(
+            base_url="https://tavily.test",
+            transport=httpx.MockTransport(lambda request: httpx.Response(500)),
+        ) as client:
+            return [urls async for urls in tavily.search_urls(["swim bondi"], 2, client)]
+
+    assert asyncio.run(scenario()) == [[]]
+    assert cache._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0